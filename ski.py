@@ -1,7 +1,21 @@
+import time
+IMPORT_START = time.perf_counter() # Start of the startup report's first phase
+import os # Needed for high score file path
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # Importing ski prints nothing
 import pygame
 import random
 import sys
-import os # Needed for high score file path
+import queue
+import tempfile
+import threading
+import argparse
+import array
+import json
+import math
+import struct
+import weakref
+import zlib
+from collections import OrderedDict, deque
 
 # --- Constants ---
 SCREEN_WIDTH = 800
@@ -23,9 +37,48 @@ FLAG_HEIGHT = 30 # Height of the flag triangle + pole
 INITIAL_SCROLL_SPEED = 4  # Initial speed obstacles move up
 SPEED_INCREASE_PERCENT = 0.10 # Increase speed by 10%
 GATE_PADDING = 25 # Minimum extra space on each side of the player within a gate
-HIGH_SCORE_FILE = "horace_high_scores.txt"
+HIGH_SCORE_FILE = "horace_high_scores.txt" # Legacy text table, migrated on first run
+HIGH_SCORE_STORE_FILE = "horace_high_scores.bin"
 NUM_HIGH_SCORES_DISPLAY = 3
 NUM_HIGH_SCORES_STORE = 10 # Store more than displayed
+# Renderer mode: "fast" pre-converts and compacts the parallax layers, "classic" blits
+# the original full-screen surfaces (kept for comparison), "gpu" composites textures with
+# the SDL2 renderer and scales the 800x600 frame to any window size
+RENDERER_MODE = os.environ.get("SKI_RENDERER", "fast")
+# GPU renderer window: SKI_WINDOW=WIDTHxHEIGHT (resizable), SKI_FULLSCREEN=1 for the
+# desktop resolution, SKI_SCALE=aspect (fill, keep 4:3) or integer (sharp pixel multiples)
+WINDOW_SETTING = os.environ.get("SKI_WINDOW", "800x600")
+WINDOW_SIZE = (800, 600) # Parsed from WINDOW_SETTING by parse_display_settings()
+FULLSCREEN = os.environ.get("SKI_FULLSCREEN", "") not in ("", "0")
+SCALE_MODE = os.environ.get("SKI_SCALE", "aspect")
+# Render quality: SKI_QUALITY=auto (default) lets a governor shed render cost when frames
+# run over budget; 0-3 fixes a tier (see QUALITY_TIERS)
+QUALITY_MODE = os.environ.get("SKI_QUALITY", "auto")
+# Frame profiler: SKI_PROFILE=1 starts with it on (F3 toggles), SKI_PROFILE_OUT streams
+# per-frame records to a .csv or .jsonl file
+PROFILE_ENABLED = os.environ.get("SKI_PROFILE", "") not in ("", "0")
+PROFILE_OUTPUT = os.environ.get("SKI_PROFILE_OUT")
+TICK_RATE = 60 # Simulation steps per second
+TICK_MS = 1000 / TICK_RATE # Simulated milliseconds per step
+# Render rate cap in frames per second (0 = uncapped). The simulation always steps at
+# TICK_RATE; frames in between are interpolated, so high-refresh displays stay smooth.
+FPS_SETTING = os.environ.get("SKI_FPS", str(TICK_RATE))
+TARGET_FPS = TICK_RATE # Parsed from FPS_SETTING by parse_display_settings()
+# Frame pacing: SKI_PACING=hybrid (default: sleep, then spin to the exact deadline), busy
+# (Clock.tick_busy_loop) or sleep (Clock.tick). SKI_VSYNC=1 syncs presents to the display
+# refresh (through a SCALED window); combine it with SKI_FPS=0 to let the display alone
+# pace the frames.
+PACING_MODE = os.environ.get("SKI_PACING", "hybrid")
+VSYNC = os.environ.get("SKI_VSYNC", "") not in ("", "0")
+MAX_FRAME_MS = 250 # Longest real-time gap simulated in one frame (e.g. after a window drag)
+OBSTACLE_SPAWN_DELAY = 800 # Milliseconds between spawn rolls
+OBSTACLE_SPAWN_TICKS = round(OBSTACLE_SPAWN_DELAY / TICK_MS) # Ticks between spawn rolls
+BACKGROUND_SEED = int(os.environ.get("SKI_BACKGROUND_SEED", "2024")) # Snow dots and clouds
+REPLAY_DIR = os.environ.get("SKI_REPLAY_DIR", "replays")
+CACHE_DIR = os.environ.get("SKI_CACHE_DIR", "cache") # Generated backgrounds, keyed by seed
+# Gameplay telemetry: SKI_TELEMETRY=binary (default), jsonl or off; one file per session
+TELEMETRY_FORMAT = os.environ.get("SKI_TELEMETRY", "binary")
+TELEMETRY_DIR = os.environ.get("SKI_TELEMETRY_DIR", "telemetry")
 
 # Game States
 STATE_START_SCREEN = 0
@@ -48,40 +101,391 @@ MOUNTAIN_COLOR_FAR = (160, 160, 180) # Distant mountains
 MOUNTAIN_COLOR_NEAR = (130, 130, 150) # Closer hills
 # SNOW_COLOR = (240, 240, 250) # Ground snow color - Removing solid fill
 CLOUD_COLOR = (255, 255, 255, 160) # White clouds with alpha
+FLAT_CLOUD_COLOR = (215, 220, 232) # Opaque stand-in for the clouds at reduced quality
 
 # --- Utility Functions ---
 
-def load_high_scores():
-    """Loads high scores from the file."""
+def load_legacy_high_scores(path=HIGH_SCORE_FILE):
+    """Reads the old one-score-per-line text file (used to migrate to the binary store)."""
     scores = []
-    if not os.path.exists(HIGH_SCORE_FILE):
-        return []
+    invalid = 0
     try:
-        with open(HIGH_SCORE_FILE, 'r') as f:
+        with open(path, 'r') as f:
             for line in f:
                 try:
                     scores.append(int(line.strip()))
                 except ValueError:
-                    print(f"Warning: Skipping invalid score line: {line.strip()}")
-        scores.sort(reverse=True)
-        return scores[:NUM_HIGH_SCORES_STORE]
+                    invalid += 1
     except IOError as e:
         print(f"Error loading high scores: {e}")
         return []
+    if invalid:
+        log_event('invalid_scores', a=invalid)
+    scores.sort(reverse=True)
+    return scores[:NUM_HIGH_SCORES_STORE]
 
-def save_high_scores(new_score, scores_list):
-    """Adds a new score, sorts, keeps top N, and saves to file."""
-    scores_list.append(new_score)
-    scores_list.sort(reverse=True)
-    scores_list = scores_list[:NUM_HIGH_SCORES_STORE]
+def write_file_atomically(path, data):
+    """Writes `data` to a temp file next to `path`, then renames it over `path`."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
     try:
-        with open(HIGH_SCORE_FILE, 'w') as f:
-            for score in scores_list:
-                f.write(f"{score}\n")
-        return scores_list
-    except IOError as e:
-        print(f"Error saving high scores: {e}")
-        return scores_list
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+# --- High Score Store ---
+class ScoreRecord:
+    """One finished run in the high-score table."""
+    __slots__ = ('score', 'seed', 'duration_ms', 'max_speed', 'gates_passed', 'timestamp')
+
+    def __init__(self, score, seed=0, duration_ms=0, max_speed=0.0, gates_passed=0, timestamp=0):
+        self.score = score
+        self.seed = seed
+        self.duration_ms = duration_ms
+        self.max_speed = max_speed
+        self.gates_passed = gates_passed
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_simulation(cls, sim):
+        return cls(sim.score, sim.seed, int(sim.sim_time_ms()), sim.max_scroll_speed, sim.gates_passed, int(time.time()))
+
+# Binary layout: header (magic, version, record count), fixed-size records, then a CRC32
+# of everything before it.
+SCORE_STORE_MAGIC = b"SKHS"
+SCORE_STORE_VERSION = 1
+_SCORE_HEADER = struct.Struct("<4sBH")
+_SCORE_RECORD = struct.Struct("<IQIfIq") # score, seed, duration_ms, max_speed, gates_passed, timestamp
+_SCORE_CRC = struct.Struct("<I")
+
+def encode_score_records(records):
+    data = bytearray(_SCORE_HEADER.pack(SCORE_STORE_MAGIC, SCORE_STORE_VERSION, len(records)))
+    for r in records:
+        data += _SCORE_RECORD.pack(r.score, r.seed, r.duration_ms, r.max_speed, r.gates_passed, r.timestamp)
+    data += _SCORE_CRC.pack(zlib.crc32(data))
+    return bytes(data)
+
+def decode_score_records(data):
+    """Parses a score store. Raises ValueError if it is malformed or corrupt."""
+    if len(data) < _SCORE_HEADER.size + _SCORE_CRC.size:
+        raise ValueError("score store is truncated")
+    body, (crc,) = data[:-_SCORE_CRC.size], _SCORE_CRC.unpack(data[-_SCORE_CRC.size:])
+    if zlib.crc32(body) != crc:
+        raise ValueError("score store checksum mismatch")
+    magic, version, count = _SCORE_HEADER.unpack_from(body)
+    if magic != SCORE_STORE_MAGIC or version != SCORE_STORE_VERSION:
+        raise ValueError("not a version 1 score store")
+    if len(body) != _SCORE_HEADER.size + count * _SCORE_RECORD.size:
+        raise ValueError("score store record count does not match its size")
+    return [ScoreRecord(*fields) for fields in _SCORE_RECORD.iter_unpack(body[_SCORE_HEADER.size:])]
+
+class ScoreStore:
+    """The high-score table, persisted by a background writer thread.
+
+    The table lives in memory; submit() updates it immediately and queues a snapshot for
+    the writer, which replaces the file atomically. write() queues any other game-over
+    file (replays) for the same thread. Queued writes to one path are coalesced, so the
+    game loop never waits on disk. close() flushes pending writes.
+    """
+    def __init__(self, path=HIGH_SCORE_STORE_FILE, legacy_path=HIGH_SCORE_FILE):
+        self.path = path
+        self.records = self._load(legacy_path)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="score-writer", daemon=True)
+        self._writer.start()
+
+    def _load(self, legacy_path):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    return decode_score_records(f.read())
+            except (IOError, ValueError) as e:
+                print(f"Error loading high scores: {e}")
+                return []
+        if legacy_path and os.path.exists(legacy_path):
+            # One-time migration from the text file (it is left in place)
+            records = [ScoreRecord(score) for score in load_legacy_high_scores(legacy_path)]
+            try:
+                write_file_atomically(self.path, encode_score_records(records))
+            except IOError as e:
+                print(f"Error saving high scores: {e}")
+            return records
+        return []
+
+    def scores(self):
+        return [r.score for r in self.records]
+
+    def submit(self, record):
+        """Adds a run, keeps the top N and schedules a write. Returns the new score list."""
+        self.records.append(record)
+        self.records.sort(key=lambda r: r.score, reverse=True)
+        del self.records[NUM_HIGH_SCORES_STORE:]
+        self.write(self.path, encode_score_records(self.records))
+        return self.scores()
+
+    def write(self, path, data):
+        """Queues `data` to replace the file at `path` (its directory is created if needed)."""
+        self._queue.put((path, data))
+
+    def _write_loop(self):
+        while True:
+            pending = {}
+            item = self._queue.get()
+            stop = item is None
+            if item is not None:
+                pending[item[0]] = item[1]
+            # Only the newest queued data for each path matters
+            while not self._queue.empty():
+                item = self._queue.get()
+                if item is None:
+                    stop = True
+                else:
+                    pending[item[0]] = item[1]
+            for path, data in pending.items():
+                try:
+                    directory = os.path.dirname(path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    write_file_atomically(path, data)
+                except IOError as e:
+                    what = "high scores" if path == self.path else "replay"
+                    print(f"Error saving {what}: {e}")
+            if stop:
+                return
+
+    def close(self):
+        """Writes anything pending and stops the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+
+# --- Telemetry ---
+# Gameplay events go into a preallocated ring buffer of fixed-size records; a background
+# thread drains it to rotating session files, so recording an event never touches disk.
+# Each event carries up to two values, named per event below.
+TELEMETRY_EVENTS = {
+    # name: (code, name of value a (integer), name of value b (float))
+    'session_start': (0, 'pid', 'wall_time'),
+    'session_end': (1, 'frames', 'duration_s'),
+    'game_start': (2, 'seed', 'forest'),
+    'game_end': (3, 'score', 'max_speed'),
+    'spawn_tree': (4, 'x', None),
+    'spawn_gate': (5, 'left_x', 'right_x'),
+    'gate_passed': (6, 'score', None),
+    'gate_missed': (7, 'score', None),
+    'tree_hit': (8, 'score', None),
+    'speed_up': (9, 'score', 'speed'),
+    'frame_spike': (10, 'frame', 'frame_ms'),
+    'invalid_scores': (11, 'lines', None),
+    'quality_change': (12, 'tier', 'frame_ms_p90'),
+}
+TELEMETRY_EVENT_NAMES = {code: name for name, (code, _, _) in TELEMETRY_EVENTS.items()}
+TELEMETRY_MAGIC = b"SKTL"
+TELEMETRY_VERSION = 1
+_TELEMETRY_HEADER = struct.Struct("<4sBd") # magic, version, session start (Unix time)
+# ms since session start, tick, event, a, b. `a` is unsigned so 64-bit seeds fit
+_TELEMETRY_RECORD = struct.Struct("<dIBxxxQd")
+TELEMETRY_RING_EVENTS = 4096
+TELEMETRY_FLUSH_SECONDS = 1.0
+TELEMETRY_MAX_FILE_BYTES = 4 << 20 # A session's file rotates to a new part beyond this
+TELEMETRY_MAX_FILES = 100 # Oldest files in the directory are deleted beyond this
+FRAME_SPIKE_BUDGETS = 2 # Frames longer than this many frame budgets are recorded as spikes
+
+class Telemetry:
+    """Buffered event stream for one session, written as binary (.skt) or JSONL files.
+
+    record() packs the event into the next free slot of the ring and returns; it never
+    blocks. A writer thread drains the ring every TELEMETRY_FLUSH_SECONDS (sooner when
+    it is half full) and appends to `<directory>/session_<start>_<pid>[_<part>].<ext>`,
+    starting a new part past TELEMETRY_MAX_FILE_BYTES. If the writer falls a whole ring
+    behind, new events are dropped and counted in `dropped`, as are events whose values
+    don't fit a record, so a bad value never raises into the game (an unknown event
+    name is a bug and raises KeyError). close() flushes everything.
+    """
+    def __init__(self, directory, file_format='binary', capacity=TELEMETRY_RING_EVENTS):
+        if file_format not in ('binary', 'jsonl'):
+            raise ValueError(f"unknown telemetry format {file_format!r} (expected binary or jsonl)")
+        self.directory = directory
+        self.file_format = file_format
+        self.capacity = capacity
+        self.ring = bytearray(capacity * _TELEMETRY_RECORD.size)
+        self.head = 0 # Events recorded (written only by the game thread)
+        self.tail = 0 # Events flushed (written only by the writer thread)
+        self.dropped = 0
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.wall_start))
+        self.base_name = f"session_{stamp}_{os.getpid()}"
+        self.part = 0
+        self.file = None
+        self._wake = threading.Event()
+        self._stop = False
+        self._writer = threading.Thread(target=self._write_loop, name="telemetry-writer", daemon=True)
+        self._writer.start()
+        self.record('session_start', a=os.getpid(), b=self.wall_start)
+
+    def record(self, name, tick=0, a=0, b=0.0):
+        """Queues event `name` (see TELEMETRY_EVENTS) with its values."""
+        head = self.head
+        pending = head - self.tail
+        if pending >= self.capacity:
+            self.dropped += 1
+            return
+        code = TELEMETRY_EVENTS[name][0]
+        try:
+            _TELEMETRY_RECORD.pack_into(self.ring, (head % self.capacity) * _TELEMETRY_RECORD.size,
+                                        (time.perf_counter() - self.start) * 1000.0, tick,
+                                        code, int(a), float(b))
+        except (struct.error, TypeError, ValueError, OverflowError):
+            self.dropped += 1
+            return
+        self.head = head + 1
+        if pending + 1 == self.capacity // 2:
+            self._wake.set()
+
+    def _drain(self):
+        """Writes every event recorded so far."""
+        head, tail = self.head, self.tail
+        if head == tail:
+            return
+        size = _TELEMETRY_RECORD.size
+        first, last = tail % self.capacity, head % self.capacity
+        if first < last:
+            chunk = bytes(self.ring[first * size:last * size])
+        else: # Wrapped around the end of the ring
+            chunk = bytes(self.ring[first * size:]) + bytes(self.ring[:last * size])
+        self.tail = head
+        try:
+            self._write(chunk)
+        except OSError as e:
+            print(f"Error writing telemetry: {e}")
+
+    def _write(self, chunk):
+        if self.file is not None and self.file.tell() >= TELEMETRY_MAX_FILE_BYTES:
+            self.file.close()
+            self.file = None
+            self.part += 1
+        if self.file is None:
+            self.file = self._open_part()
+        if self.file_format == 'binary':
+            self.file.write(chunk)
+        else:
+            self.file.write(''.join(json.dumps(event) + '\n' for event in decode_telemetry_records(chunk)).encode())
+        self.file.flush()
+
+    def _open_part(self):
+        os.makedirs(self.directory, exist_ok=True)
+        extension = 'skt' if self.file_format == 'binary' else 'jsonl'
+        while True: # Skip parts another session started in the same second already took
+            suffix = f"_{self.part}" if self.part else ""
+            path = os.path.join(self.directory, f"{self.base_name}{suffix}.{extension}")
+            try:
+                f = open(path, 'xb')
+                break
+            except FileExistsError:
+                self.part += 1
+        if self.file_format == 'binary':
+            f.write(_TELEMETRY_HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, self.wall_start))
+        prune_telemetry_files(self.directory, keep=path)
+        return f
+
+    def _write_loop(self):
+        while not self._stop:
+            self._wake.wait(TELEMETRY_FLUSH_SECONDS)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+        if self.file is not None:
+            self.file.close()
+
+    def close(self, frames=0):
+        """Records the session end, writes everything pending and stops the writer."""
+        if self._writer.is_alive():
+            self.record('session_end', a=frames, b=time.perf_counter() - self.start)
+            self._stop = True
+            self._wake.set()
+            self._writer.join()
+
+def telemetry_files(directory):
+    """Session files (.skt and .jsonl) in `directory`, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    paths = [os.path.join(directory, name) for name in names
+             if name.startswith("session_") and name.endswith((".skt", ".jsonl"))]
+    return sorted(paths, key=os.path.getmtime)
+
+def prune_telemetry_files(directory, keep=None, limit=TELEMETRY_MAX_FILES):
+    """Deletes the oldest session files beyond `limit` (never `keep`)."""
+    paths = [path for path in telemetry_files(directory) if path != keep]
+    for path in paths[:max(0, len(paths) - (limit - 1))]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def decode_telemetry_records(data):
+    """Yields each packed record in `data` as a dict (the form JSONL files hold)."""
+    for t_ms, tick, code, a, b in _TELEMETRY_RECORD.iter_unpack(data):
+        name = TELEMETRY_EVENT_NAMES.get(code, 'unknown')
+        event = {'t_ms': round(t_ms, 3), 'tick': tick, 'event': name}
+        _, a_name, b_name = TELEMETRY_EVENTS.get(name, (code, 'a', 'b'))
+        if a_name:
+            event[a_name] = a
+        if b_name:
+            event[b_name] = b
+        yield event
+
+def read_telemetry_file(path):
+    """Returns a session file's events as (t_ms, tick, name, a, b) tuples, whichever
+    format it is in. Raises ValueError if it is not a telemetry file.
+
+    A binary file cut short by a crash keeps every complete record.
+    """
+    if path.endswith(".jsonl"):
+        events = []
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                    _, a_name, b_name = TELEMETRY_EVENTS[event['event']]
+                except (ValueError, KeyError) as e:
+                    raise ValueError(f"{path}: bad event line: {e}") from None
+                events.append((event['t_ms'], event['tick'], event['event'],
+                               event.get(a_name, 0), event.get(b_name, 0.0)))
+        return events
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _TELEMETRY_HEADER.size:
+        raise ValueError(f"{path}: too short to be a telemetry file")
+    magic, version, _ = _TELEMETRY_HEADER.unpack_from(data)
+    if magic != TELEMETRY_MAGIC or version != TELEMETRY_VERSION:
+        raise ValueError(f"{path}: not a version {TELEMETRY_VERSION} telemetry file")
+    body = memoryview(data)[_TELEMETRY_HEADER.size:]
+    body = body[:len(body) - len(body) % _TELEMETRY_RECORD.size]
+    names = TELEMETRY_EVENT_NAMES
+    return [(t_ms, tick, names.get(code, 'unknown'), a, b)
+            for t_ms, tick, code, a, b in _TELEMETRY_RECORD.iter_unpack(body)]
+
+# The running game's stream (None when telemetry is off or outside the game)
+telemetry = None
+
+def log_event(name, tick=0, a=0, b=0.0):
+    """Records a telemetry event if the game has a stream open; otherwise does nothing."""
+    if telemetry is not None:
+        telemetry.record(name, tick, a, b)
 
 
 # --- Player Class ---
@@ -92,11 +496,17 @@ class Player(pygame.sprite.Sprite):
         self.image_straight = self._create_player_image("straight")
         self.image_left = self._create_player_image("left")
         self.image_right = self._create_player_image("right")
+        # Pixel masks per pose for exact tree collisions, built once
+        self.mask_straight = pygame.mask.from_surface(self.image_straight)
+        self.mask_left = pygame.mask.from_surface(self.image_left)
+        self.mask_right = pygame.mask.from_surface(self.image_right)
         self.image = self.image_straight
+        self.mask = self.mask_straight
         self.rect = pygame.Rect(0, 0, PLAYER_WIDTH, PLAYER_HEIGHT)
         self.rect.centerx = SCREEN_WIDTH // 2
         self.rect.bottom = SCREEN_HEIGHT - 20
         self.speed_x = 0
+        self.prev_x = self.rect.x
         self.image_rect = self.image.get_rect(center=self.rect.center)
 
     def _create_player_image(self, direction):
@@ -134,51 +544,216 @@ class Player(pygame.sprite.Sprite):
         self.rect.centerx = SCREEN_WIDTH // 2
         self.rect.bottom = SCREEN_HEIGHT - 20
         self.speed_x = 0
+        self.prev_x = self.rect.x
         self.image = self.image_straight
+        self.mask = self.mask_straight
         self.image_rect.center = self.rect.center
 
-    def update(self):
-        # (Update logic remains the same)
-        keys = pygame.key.get_pressed()
+    def update(self, left=False, right=False):
+        """Steers the player from the given input state (right wins if both are held)."""
+        self.prev_x = self.rect.x # Where the previous tick left us, for interpolation
         self.speed_x = 0
-        if keys[pygame.K_LEFT]: self.speed_x = -PLAYER_SPEED
-        if keys[pygame.K_RIGHT]: self.speed_x = PLAYER_SPEED
+        if left: self.speed_x = -PLAYER_SPEED
+        if right: self.speed_x = PLAYER_SPEED
         self.rect.x += self.speed_x
         if self.rect.left < 0: self.rect.left = 0
         if self.rect.right > SCREEN_WIDTH: self.rect.right = SCREEN_WIDTH
-        if self.speed_x < 0: self.image = self.image_left
-        elif self.speed_x > 0: self.image = self.image_right
-        else: self.image = self.image_straight
+        if self.speed_x < 0: self.image, self.mask = self.image_left, self.mask_left
+        elif self.speed_x > 0: self.image, self.mask = self.image_right, self.mask_right
+        else: self.image, self.mask = self.image_straight, self.mask_straight
         self.image_rect.center = self.rect.center
 
-    def draw(self, surface):
-        surface.blit(self.image, self.image_rect)
+    def draw(self, surface, alpha=1.0):
+        """Draws the player `alpha` of the way from the previous tick's position to the current one."""
+        dx = round((alpha - 1.0) * (self.rect.x - self.prev_x))
+        surface.blit(self.image, (self.image_rect.x + dx, self.image_rect.y))
+
+# --- Sprite Cache ---
+TREE_TYPES = ('pine1', 'pine2')
+
+def draw_tree_image(surface, tree_type, x=0, y=0):
+    """Draws a tree variant into `surface` with its top-left corner at (x, y)."""
+    trunk_height = 10
+    trunk_width = 8
+    foliage_height = OBSTACLE_HEIGHT - trunk_height
+    trunk_rect = pygame.Rect(x + (OBSTACLE_WIDTH - trunk_width) // 2, y + foliage_height, trunk_width, trunk_height)
+    pygame.draw.rect(surface, BROWN, trunk_rect)
+    if tree_type == 'pine1':
+        color = GREEN
+        points = [(OBSTACLE_WIDTH // 2, 0), (0, foliage_height), (OBSTACLE_WIDTH, foliage_height)]
+        pygame.draw.polygon(surface, color, [(x + px, y + py) for px, py in points])
+    elif tree_type == 'pine2':
+        color = DARK_GREEN
+        points = [(OBSTACLE_WIDTH // 2, 5), (0, foliage_height), (OBSTACLE_WIDTH, foliage_height)]
+        pygame.draw.polygon(surface, color, [(x + px, y + py) for px, py in points])
+        points_top = [(OBSTACLE_WIDTH // 2, 0), (OBSTACLE_WIDTH * 0.25, 10), (OBSTACLE_WIDTH * 0.75, 10)]
+        pygame.draw.polygon(surface, color, [(x + px, y + py) for px, py in points_top])
+
+def draw_flag_image(surface, color, is_left, x=0, y=0):
+    """Draws a flag (pole + triangle) into `surface` with its top-left corner at (x, y)."""
+    pole_x = FLAG_TRIANGLE_WIDTH if is_left else 0
+    pole_rect = pygame.Rect(x + pole_x, y, FLAG_POLE_WIDTH, FLAG_HEIGHT)
+    pygame.draw.rect(surface, BLACK, pole_rect)
+    triangle_base_y = 5
+    triangle_height = FLAG_HEIGHT - 10
+    triangle_tip_x = 0 if is_left else FLAG_IMAGE_WIDTH
+    triangle_base_x = pole_x + (FLAG_POLE_WIDTH // 2)
+    triangle_points = [(triangle_base_x, triangle_base_y), (triangle_base_x, triangle_base_y + triangle_height), (triangle_tip_x, triangle_base_y + triangle_height // 2)]
+    pygame.draw.polygon(surface, color, [(x + px, y + py) for px, py in triangle_points])
+
+class SpriteCache:
+    """Pre-rendered tree and flag images packed into one shared atlas surface.
+
+    Sprites take their image from here instead of drawing their own Surface, so a spawn
+    costs no allocation or draw calls. Call convert() once a display mode is set to
+    switch the atlas to the display format; the cached images are subsurfaces of it.
+    """
+    FLAG_VARIANTS = ((GREEN, True), (DARK_RED, False)) # Left and right gate flags
+
+    def __init__(self):
+        self.slots = {} # key -> Rect of the image inside the atlas
+        x = 0
+        for tree_type in TREE_TYPES:
+            self.slots[('tree', tree_type)] = pygame.Rect(x, 0, OBSTACLE_WIDTH, OBSTACLE_HEIGHT)
+            x += OBSTACLE_WIDTH
+        for color, is_left in self.FLAG_VARIANTS:
+            self.slots[('flag', color, is_left)] = pygame.Rect(x, 0, FLAG_IMAGE_WIDTH, FLAG_HEIGHT)
+            x += FLAG_IMAGE_WIDTH
+        self.atlas = pygame.Surface((x, max(OBSTACLE_HEIGHT, FLAG_HEIGHT)), pygame.SRCALPHA)
+        for key, rect in self.slots.items():
+            if key[0] == 'tree':
+                draw_tree_image(self.atlas, key[1], rect.x, rect.y)
+            else:
+                draw_flag_image(self.atlas, key[1], key[2], rect.x, rect.y)
+        self._build_images()
+        # Collision masks depend only on the shapes, so they survive convert()
+        self.tree_masks = {tree_type: pygame.mask.from_surface(self.tree(tree_type)) for tree_type in TREE_TYPES}
+
+    def _build_images(self):
+        self.images = {key: self.atlas.subsurface(rect) for key, rect in self.slots.items()}
+
+    def convert(self):
+        """Converts the atlas to the display format (requires pygame.display.set_mode)."""
+        self.atlas = self.atlas.convert_alpha()
+        self._build_images()
+
+    def tree(self, tree_type):
+        return self.images[('tree', tree_type)]
+
+    def tree_mask(self, tree_type):
+        return self.tree_masks[tree_type]
+
+    def flag(self, color, is_left):
+        key = ('flag', color, is_left)
+        image = self.images.get(key)
+        if image is None: # Uncommon colour: draw it once and keep it outside the atlas
+            image = pygame.Surface([FLAG_IMAGE_WIDTH, FLAG_HEIGHT], pygame.SRCALPHA)
+            draw_flag_image(image, color, is_left)
+            self.images[key] = image
+        return image
+
+_sprite_cache = None
+
+def get_sprite_cache():
+    """Returns the shared SpriteCache, building it on first use."""
+    global _sprite_cache
+    if _sprite_cache is None:
+        _sprite_cache = SpriteCache()
+    return _sprite_cache
+
+# --- Sprite Pool ---
+class SpritePool:
+    """Free list of retired entities of one kind (trees or gates).
+
+    acquire() re-seats a retired entity via its reseat() method when one is free and
+    only calls `factory` otherwise; entities hand themselves back with release() when
+    they scroll off screen. `hits` and `allocations` count the two outcomes.
+    """
+    __slots__ = ('factory', 'free', 'hits', 'allocations')
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+        self.hits = 0
+        self.allocations = 0
+
+    def acquire(self, *args):
+        if self.free:
+            self.hits += 1
+            item = self.free.pop()
+            item.reseat(*args)
+            return item
+        self.allocations += 1
+        item = self.factory(*args)
+        item.pool = self
+        return item
+
+    def release(self, item):
+        self.free.append(item)
+
+    def stats(self):
+        return {'hits': self.hits, 'allocations': self.allocations, 'free': len(self.free)}
+
+# --- Spatial Index ---
+def round_half_away(value):
+    """Rounds like pygame does when a float is stored in a Rect (halves away from zero)."""
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+class RowIndex:
+    """Buckets sprites by the world row of their top edge.
+
+    World rows stay fixed while everything scrolls, so a sprite is filed once when it
+    spawns and a query only looks at the buckets overlapping a band of rows. Entries
+    for sprites that were killed are skipped and dropped when the sprite is re-filed.
+    """
+    def __init__(self, row_height=64):
+        self.row_height = row_height
+        self.rows = {}
+
+    def insert(self, sprite, world_y):
+        old_row = getattr(sprite, 'index_row', None)
+        if old_row is not None:
+            bucket = self.rows.get(old_row)
+            if bucket is not None and sprite in bucket:
+                bucket.remove(sprite)
+                if not bucket:
+                    del self.rows[old_row]
+        row = world_y // self.row_height
+        self.rows.setdefault(row, []).append(sprite)
+        sprite.index_row = row
+
+    def query(self, world_top, world_bottom):
+        """Yields live sprites filed in rows overlapping [world_top, world_bottom]."""
+        rows = self.rows
+        for row in range(world_top // self.row_height, world_bottom // self.row_height + 1):
+            bucket = rows.get(row)
+            if bucket:
+                for sprite in bucket:
+                    if sprite.alive():
+                        yield sprite
+
+    def clear(self):
+        self.rows.clear()
 
 # --- Obstacle Class (Trees) ---
 class Obstacle(pygame.sprite.Sprite):
     """Represents obstacles (trees) with varied graphics."""
-    def __init__(self, x, y, speed):
-        # (Init code remains the same)
+    def __init__(self, x, y, speed, tree_type=None):
         super().__init__()
+        self.pool = None # SpritePool to return to once off screen
+        self.rect = pygame.Rect(0, 0, OBSTACLE_WIDTH, OBSTACLE_HEIGHT)
+        self.reseat(x, y, speed, tree_type)
+
+    def reseat(self, x, y, speed, tree_type=None):
+        """(Re)places the tree at (x, y) with the given variant."""
         self.speed_y = speed
-        tree_type = random.choice(['pine1', 'pine2'])
-        self.image = pygame.Surface([OBSTACLE_WIDTH, OBSTACLE_HEIGHT], pygame.SRCALPHA)
-        trunk_height = 10
-        trunk_width = 8
-        foliage_height = OBSTACLE_HEIGHT - trunk_height
-        trunk_rect = pygame.Rect((OBSTACLE_WIDTH - trunk_width) // 2, foliage_height, trunk_width, trunk_height)
-        pygame.draw.rect(self.image, BROWN, trunk_rect)
-        if tree_type == 'pine1':
-            color = GREEN
-            points = [(OBSTACLE_WIDTH // 2, 0), (0, foliage_height), (OBSTACLE_WIDTH, foliage_height)]
-            pygame.draw.polygon(self.image, color, points)
-        elif tree_type == 'pine2':
-            color = DARK_GREEN
-            points = [(OBSTACLE_WIDTH // 2, 5), (0, foliage_height), (OBSTACLE_WIDTH, foliage_height)]
-            pygame.draw.polygon(self.image, color, points)
-            points_top = [(OBSTACLE_WIDTH // 2, 0), (OBSTACLE_WIDTH * 0.25, 10), (OBSTACLE_WIDTH * 0.75, 10)]
-            pygame.draw.polygon(self.image, color, points_top)
-        self.rect = self.image.get_rect(x=x, y=y)
+        if tree_type is None:
+            tree_type = random.choice(TREE_TYPES)
+        self.tree_type = tree_type
+        cache = get_sprite_cache()
+        self.image = cache.tree(tree_type) # Shared, never drawn into
+        self.mask = cache.tree_mask(tree_type)
+        self.rect.topleft = (x, y)
 
     def update(self, current_speed):
         """Move the obstacle up the screen based on current game speed."""
@@ -186,28 +761,25 @@ class Obstacle(pygame.sprite.Sprite):
         self.rect.y += self.speed_y
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
+            if self.pool is not None:
+                self.pool.release(self)
 
 # --- Flag Class ---
 class Flag(pygame.sprite.Sprite):
     """Represents flags (poles with triangles) to ski between."""
     def __init__(self, x, y, color, speed, is_left):
-        # (Init code remains the same)
         super().__init__()
-        self.speed_y = speed
-        self.passed = False
         self.is_left = is_left
-        self.image = pygame.Surface([FLAG_IMAGE_WIDTH, FLAG_HEIGHT], pygame.SRCALPHA)
-        pole_x = FLAG_TRIANGLE_WIDTH if is_left else 0
-        pole_rect = pygame.Rect(pole_x, 0, FLAG_POLE_WIDTH, FLAG_HEIGHT)
-        pygame.draw.rect(self.image, BLACK, pole_rect)
-        triangle_base_y = 5
-        triangle_height = FLAG_HEIGHT - 10
-        triangle_tip_x = 0 if is_left else FLAG_IMAGE_WIDTH
-        triangle_base_x = pole_x + (FLAG_POLE_WIDTH // 2)
-        triangle_points = [(triangle_base_x, triangle_base_y), (triangle_base_x, triangle_base_y + triangle_height), (triangle_tip_x, triangle_base_y + triangle_height // 2)]
-        pygame.draw.polygon(self.image, color, triangle_points)
+        self.gate = None # Owning Gate, told when the flag scrolls off screen
+        self.image = get_sprite_cache().flag(color, is_left) # Shared, never drawn into
         self.rect = self.image.get_rect()
-        if is_left: self.rect.topleft = (x - FLAG_TRIANGLE_WIDTH, y)
+        self.reseat(x, y, speed)
+
+    def reseat(self, x, y, speed):
+        """(Re)places the flag with its pole's inner edge at x."""
+        self.speed_y = speed
+        self.passed = False
+        if self.is_left: self.rect.topleft = (x - FLAG_TRIANGLE_WIDTH, y)
         else: self.rect.topright = (x + FLAG_TRIANGLE_WIDTH, y)
 
     def update(self, current_speed):
@@ -216,24 +788,913 @@ class Flag(pygame.sprite.Sprite):
         self.rect.y += self.speed_y
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
+            if self.gate is not None:
+                self.gate.flag_retired()
+
+# --- Gate (Flag Pair) ---
+class Gate:
+    """A left/right flag pair the player must ski between, with its pass/miss state."""
+    __slots__ = ('left_flag', 'right_flag', 'passed', 'missed', 'pool')
+
+    def __init__(self, left_inner_x, right_inner_x, y, speed):
+        self.pool = None # SpritePool to return to once both flags are off screen
+        self.left_flag = Flag(left_inner_x, y, GREEN, speed, is_left=True)
+        self.right_flag = Flag(right_inner_x, y, DARK_RED, speed, is_left=False)
+        self.left_flag.gate = self.right_flag.gate = self
+        self.passed = False
+        self.missed = False
+
+    def reseat(self, left_inner_x, right_inner_x, y, speed):
+        self.left_flag.reseat(left_inner_x, y, speed)
+        self.right_flag.reseat(right_inner_x, y, speed)
+        self.passed = False
+        self.missed = False
+
+    @property
+    def rect(self):
+        """The gate's row: both flags share the same top and bottom."""
+        return self.left_flag.rect
+
+    def is_between(self, rect):
+        """True if `rect` fits strictly between the two flags."""
+        return rect.left > self.left_flag.rect.right and rect.right < self.right_flag.rect.left
+
+    def mark_passed(self):
+        self.passed = True
+        self.left_flag.passed = True
+        self.right_flag.passed = True
+
+    def flag_retired(self):
+        """Called as each flag leaves the screen; the gate is recycled after the second."""
+        if self.pool is not None and not self.left_flag.alive() and not self.right_flag.alive():
+            self.pool.release(self)
+
+# --- Tree Store (Forest Mode) ---
+try:
+    import numpy
+except ImportError:
+    numpy = None # The frozen build leaves NumPy out; TreeStore falls back to `array`
+
+class TreeStore:
+    """Struct-of-arrays trees for forest mode, where Obstacle sprites would be too slow.
+
+    Each tree's x, y (the top-left a Rect would hold) and variant (index into TREE_TYPES)
+    live in parallel arrays whose first `count` entries are live. With NumPy, scroll()
+    moves them all with one vectorized add and culls in bulk; without it (the frozen
+    build) the same arrays are `array.array`s walked in plain loops. Either way draw()
+    issues a single Surface.blits() against the shared variant images, and movement,
+    culling and the pixel-exact hit test match Obstacle and SkiSimulation.hit_tree.
+    """
+    def __init__(self, capacity=1024, use_numpy=True):
+        np = self.np = numpy if use_numpy else None
+        if np is not None:
+            self.x = np.zeros(capacity, dtype=np.int64)
+            self.y = np.zeros(capacity) # Float so rounding can happen in place
+            self.variant = np.zeros(capacity, dtype=np.int64)
+        else:
+            self.x = array.array('q', bytes(8 * capacity))
+            self.y = array.array('d', bytes(8 * capacity))
+            self.variant = array.array('q', bytes(8 * capacity))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, x, y, tree_type):
+        if self.count == len(self.x):
+            np = self.np
+            if np is not None:
+                self.x, self.y, self.variant = (np.concatenate((a, np.zeros_like(a))) for a in (self.x, self.y, self.variant))
+            else:
+                for a in (self.x, self.y, self.variant):
+                    a.extend(a) # Entries past `count` are never read
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.variant[i] = TREE_TYPES.index(tree_type)
+        self.count += 1
+
+    def scroll(self, speed):
+        """Moves every tree down by `speed` (rounded as a Rect would) and drops those below the screen."""
+        n = self.count
+        if not n:
+            return
+        np = self.np
+        if np is None:
+            self._scroll_loop(n, speed)
+            return
+        y = self.y[:n]
+        y += speed
+        np.copysign(np.floor(np.abs(y) + 0.5), y, out=y)
+        keep = y <= SCREEN_HEIGHT
+        if not keep.all():
+            kept = int(keep.sum())
+            for values in (self.x, self.y, self.variant):
+                values[:kept] = values[:n][keep]
+            self.count = kept
+
+    def _scroll_loop(self, n, speed):
+        x, y, variant = self.x, self.y, self.variant
+        kept = 0
+        for i in range(n):
+            new_y = y[i] + speed
+            new_y = math.copysign(math.floor(abs(new_y) + 0.5), new_y)
+            if new_y <= SCREEN_HEIGHT:
+                x[kept], y[kept], variant[kept] = x[i], new_y, variant[i]
+                kept += 1
+        self.count = kept
+
+    def _indices(self, low, high, dy=0):
+        """Indices of the live trees with low < y + dy < high."""
+        n = self.count
+        if self.np is not None:
+            y = self.y[:n] + dy if dy else self.y[:n]
+            return self.np.flatnonzero((y > low) & (y < high)).tolist()
+        y = self.y
+        return [i for i in range(n) if low < y[i] + dy < high]
+
+    def hits(self, player_mask, band):
+        """True if a tree overlaps `player_mask` drawn at `band` (the player's image rect)."""
+        near = self._indices(band.top - OBSTACLE_HEIGHT, band.bottom)
+        if not near:
+            return False
+        cache = get_sprite_cache()
+        masks = [cache.tree_mask(tree_type) for tree_type in TREE_TYPES]
+        x, y, variant = self.x, self.y, self.variant
+        for i in near:
+            if player_mask.overlap(masks[variant[i]], (int(x[i]) - band.x, int(y[i]) - band.y)):
+                return True
+        return False
+
+    def draw(self, surface, dy=0):
+        """Draws the on-screen trees shifted `dy` pixels vertically, in one blits() call."""
+        cache = get_sprite_cache()
+        images = [cache.tree(tree_type) for tree_type in TREE_TYPES]
+        np = self.np
+        if np is None:
+            x, y, variant = self.x, self.y, self.variant
+            visible = self._indices(-OBSTACLE_HEIGHT, SCREEN_HEIGHT, dy)
+            surface.blits([(images[variant[i]], (int(x[i]), int(y[i] + dy))) for i in visible], False)
+            return
+        y = self.y[:self.count] + dy
+        visible = np.flatnonzero((y > -OBSTACLE_HEIGHT) & (y < SCREEN_HEIGHT))
+        positions = zip(self.x[visible].tolist(), y[visible].astype(np.int64).tolist())
+        surface.blits(zip(map(images.__getitem__, self.variant[visible].tolist()), positions), False)
+
+# --- Input Sources ---
+def keyboard_input():
+    """Reads steering from the live keyboard. Returns (left, right)."""
+    keys = pygame.key.get_pressed()
+    return keys[pygame.K_LEFT], keys[pygame.K_RIGHT]
+
+def no_input():
+    """Input source that never steers (useful for headless runs)."""
+    return False, False
+
+# --- Seeds and Input Recording ---
+def new_seed():
+    """Returns a fresh 63-bit seed for a new run."""
+    return random.SystemRandom().getrandbits(63)
+
+def subsystem_rng(seed, name):
+    """Returns an independent, reproducible RNG for one subsystem of a seeded run."""
+    return random.Random(f"{seed}:{name}")
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varints(data):
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+    if shift:
+        raise ValueError("Truncated varint in input stream")
+
+class InputLog:
+    """Per-tick (left, right) input, run-length encoded as [state, length] runs.
+
+    The state packs the two keys as bits (left | right << 1). encode() stores each run
+    as one varint (length << 2 | state), so holding a key for a second costs one byte.
+    """
+    def __init__(self, runs=None):
+        self.runs = runs if runs is not None else []
+
+    def append(self, left, right):
+        state = (1 if left else 0) | (2 if right else 0)
+        runs = self.runs
+        if runs and runs[-1][0] == state:
+            runs[-1][1] += 1
+        else:
+            runs.append([state, 1])
+
+    def __len__(self):
+        return sum(length for _, length in self.runs)
+
+    def encode(self):
+        out = bytearray()
+        for state, length in self.runs:
+            _write_varint(out, (length << 2) | state)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data):
+        return cls([[value & 3, value >> 2] for value in _read_varints(data)])
+
+    def playback(self):
+        """Returns an input source that replays the log, then holds no keys."""
+        def states():
+            for state, length in self.runs:
+                pair = (bool(state & 1), bool(state & 2))
+                for _ in range(length):
+                    yield pair
+            while True:
+                yield False, False
+        return states().__next__
+
+# --- Course Generation ---
+COURSE_SEGMENT_SLOTS = 32 # Spawn slots (one per OBSTACLE_SPAWN_TICKS) in a course segment
+COURSE_QUEUE_DEPTH = 4 # Segments the background worker keeps ready
+TREE_REPLACE_TRIES = 8 # Re-rolls for a tree blocking a gate before it is left out
+MIN_GATE_GAP = PLAYER_WIDTH + 2 * GATE_PADDING
+MAX_GATE_GAP = 350
+# Forest mode scatters extra trees over the band between one spawn row and the next
+FOREST_BAND = OBSTACLE_SPAWN_TICKS * INITIAL_SCROLL_SPEED # Pixels above the spawn row
+MAX_FOREST = 1000 # Extra trees per spawn slot at the highest forest difficulty
+
+class CourseSegment:
+    """A run of consecutive spawn slots, each None, ('tree', x, tree_type) or
+    ('gate', left_inner_x, right_inner_x). Slot n is spawned at the top of the screen
+    n spawn rolls into the game. In forest mode `forest` holds each slot's extra trees
+    as (x, pixels above the spawn row, tree_type) tuples; otherwise it is None."""
+    __slots__ = ('index', 'placements', 'forest')
+
+    def __init__(self, index, placements, forest=None):
+        self.index = index
+        self.placements = placements
+        self.forest = forest
+
+class CourseGenerator:
+    """Deterministic slope generator: the same seed always yields the same segments.
+
+    Placements are rolled with the same odds as before, then validated with one slot of
+    look-ahead: a tree in the slot just before a gate (the last thing met on the way in)
+    may not overlap the gate's opening, so it is moved or, failing that, left out.
+
+    `forest` adds that many trees per slot from their own RNG, so the underlying course
+    is the same as without them. Forest trees over a gate's opening, in the gate's slot
+    or the one before it, are left out to keep a lane through every gate.
+    """
+    def __init__(self, seed, forest=0):
+        self.seed = seed
+        self.forest = forest
+        self.spawn_rng = subsystem_rng(seed, 'spawn') # Spawn type rolls
+        self.tree_rng = subsystem_rng(seed, 'trees') # Tree position and variant
+        self.gate_rng = subsystem_rng(seed, 'gates') # Gate gap and position
+        self.forest_rng = subsystem_rng(seed, 'forest') # Forest mode's extra trees
+        self.segments_made = 0
+        self._lookahead = self._roll()
+
+    def _roll(self):
+        """One raw placement: a tree, a gate or nothing."""
+        spawn_type = self.spawn_rng.random()
+        if spawn_type < 0.45: # Tree
+            rng = self.tree_rng
+            tree_x = rng.randint(0, SCREEN_WIDTH - OBSTACLE_WIDTH)
+            return ('tree', tree_x, rng.choice(TREE_TYPES))
+        if spawn_type < 0.9: # Flag pair
+            rng = self.gate_rng
+            actual_gap = rng.randint(MIN_GATE_GAP, MAX_GATE_GAP)
+            min_center = FLAG_IMAGE_WIDTH + actual_gap // 2
+            max_center = SCREEN_WIDTH - FLAG_IMAGE_WIDTH - actual_gap // 2
+            if min_center < max_center:
+                gap_center_x = rng.randint(min_center, max_center)
+                return ('gate', gap_center_x - actual_gap // 2, gap_center_x + actual_gap // 2)
+        return None
+
+    def _validate(self, placement, following):
+        """Returns `placement` adjusted so it doesn't block the approach to `following`."""
+        if placement is None or following is None or placement[0] != 'tree' or following[0] != 'gate':
+            return placement
+        _, left_inner_x, right_inner_x = following
+        tree_x = placement[1]
+        for _ in range(TREE_REPLACE_TRIES):
+            if tree_x + OBSTACLE_WIDTH <= left_inner_x or tree_x >= right_inner_x:
+                return ('tree', tree_x, placement[2])
+            tree_x = self.tree_rng.randint(0, SCREEN_WIDTH - OBSTACLE_WIDTH)
+        return None
+
+    def _forest_trees(self, placement, following):
+        """The forest trees for one slot, clear of the openings of `placement` and `following`."""
+        rng = self.forest_rng
+        openings = [(p[1], p[2]) for p in (placement, following) if p is not None and p[0] == 'gate']
+        trees = []
+        for _ in range(self.forest):
+            tree_x = rng.randint(0, SCREEN_WIDTH - OBSTACLE_WIDTH)
+            offset = rng.randrange(FOREST_BAND)
+            tree_type = rng.choice(TREE_TYPES)
+            if not any(tree_x + OBSTACLE_WIDTH > left and tree_x < right for left, right in openings):
+                trees.append((tree_x, offset, tree_type))
+        return tuple(trees)
+
+    def next_segment(self):
+        placements = []
+        forest = [] if self.forest else None
+        for _ in range(COURSE_SEGMENT_SLOTS):
+            placement, self._lookahead = self._lookahead, self._roll()
+            placements.append(self._validate(placement, self._lookahead))
+            if forest is not None:
+                forest.append(self._forest_trees(placement, self._lookahead))
+        segment = CourseSegment(self.segments_made, placements, forest)
+        self.segments_made += 1
+        return segment
+
+class CourseFeed:
+    """Hands the simulation one placement per spawn slot from a CourseGenerator.
+
+    With `background=True` a daemon worker generates segments ahead into a bounded
+    queue, so the game loop only pops ready ones; otherwise (headless runs, bots)
+    segments are generated on demand. Either way the placements are identical.
+    """
+    def __init__(self, generator, background=False, depth=COURSE_QUEUE_DEPTH):
+        self.generator = generator
+        self._slots = iter(())
+        self._queue = None
+        if background:
+            self._queue = queue.Queue(maxsize=depth)
+            self._stopped = threading.Event()
+            self._worker = threading.Thread(target=self._generate_loop, name="course-generator", daemon=True)
+            self._worker.start()
+
+    def _generate_loop(self):
+        while not self._stopped.is_set():
+            segment = self.generator.next_segment()
+            while not self._stopped.is_set():
+                try:
+                    self._queue.put(segment, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def _next_segment(self):
+        if self._queue is None:
+            return self.generator.next_segment()
+        return self._queue.get() # Only waits if the worker has fallen behind
+
+    def next_slot(self):
+        """Returns the next slot's (placement, forest trees); the trees are () outside forest mode."""
+        slot = next(self._slots, None)
+        if slot is None:
+            segment = self._next_segment()
+            self._slots = zip(segment.placements, segment.forest or [()] * len(segment.placements))
+            slot = next(self._slots)
+        return slot
+
+    def close(self):
+        """Stops the worker (if any); queued segments are discarded."""
+        if self._queue is not None:
+            self._stopped.set()
+            try:
+                self._queue.get_nowait() # Unblock a pending put()
+            except queue.Empty:
+                pass
+            self._worker.join()
+
+# --- Simulation Core ---
+class SkiSimulation:
+    """Headless game rules: player, trees, flags, spawning, collisions and scoring.
+
+    The simulation advances one fixed tick per call to step(). Steering comes from
+    `input_source`, a callable returning (left, right). The course comes from a
+    CourseGenerator seeded with `seed` and spawning is counted in ticks, so a seed plus
+    the per-tick inputs (recorded in `input_log`) reproduce a run exactly. With
+    `background_course=True` the course is generated ahead on a worker thread.
+
+    `forest` > 0 is the forest difficulty: that many extra trees per spawn slot. All
+    trees then live in a TreeStore (`tree_store`) instead of `obstacles`.
+    """
+    def __init__(self, input_source=no_input, seed=None, background_course=False, forest=0):
+        self.input_source = input_source
+        self.background_course = background_course
+        self.forest = 0
+        self.tree_store = None
+        self.course = None
+        self.profiler = None # Optional FrameProfiler timing the phases of step()
+        self.player = Player()
+        self.all_game_sprites = pygame.sprite.Group() # Player, obstacles and flags
+        self.obstacles = pygame.sprite.Group()
+        self.flags = pygame.sprite.Group()
+        self.tree_pool = SpritePool(Obstacle)
+        self.tree_index = RowIndex()
+        self.gate_pool = SpritePool(Gate)
+        self.reset(seed, forest)
+
+    def sim_time_ms(self):
+        """Simulated time in milliseconds since the last reset."""
+        return self.ticks * TICK_MS
+
+    def reset(self, seed=None, forest=None):
+        """Resets game variables and sprites for a new game (a fresh seed if none is given).
+
+        `forest` switches the forest difficulty; None keeps the current one.
+        """
+        if seed is None:
+            seed = new_seed()
+        self.seed = seed
+        if forest is not None and forest != self.forest:
+            self.forest = forest
+            self.tree_store = TreeStore() if forest else None
+        if self.course is not None:
+            self.course.close()
+        self.course = CourseFeed(CourseGenerator(seed, self.forest), background=self.background_course)
+        self.ticks = 0
+        self.score = 0
+        self.scroll_speed = INITIAL_SCROLL_SPEED
+        self.next_speed_increase_threshold = 100 # Score needed for next speed increase
+        self.game_over = False
+        self.game_over_reason = None # 'tree' or 'gate'
+        self.gates_passed = 0
+        self.max_scroll_speed = self.scroll_speed
+        self.last_spawn_tick = 0 # Reset spawn timer
+        # Hand everything still on screen back to the pools before emptying the groups
+        for tree in self.obstacles:
+            self.tree_pool.release(tree)
+        for flag in self.flags:
+            if flag.is_left:
+                self.gate_pool.release(flag.gate)
+        self.all_game_sprites.empty()
+        self.tree_index.clear()
+        if self.tree_store is not None:
+            self.tree_store.clear()
+        self.scroll_px = 0 # Whole pixels scrolled: world y = screen y - scroll_px
+        self.scroll_step = 0 # Pixels the last tick scrolled, for render interpolation
+        self.obstacles.empty()
+        self.flags.empty()
+        self.gates = deque() # Gates ordered bottom (oldest) to top (newest)
+        self.player.reset_position()
+        self.all_game_sprites.add(self.player)
+        self.input_log = InputLog() # Every tick's input, for replays
+
+    def spawn(self):
+        """Places the course's next slot (a tree, a gate or nothing) at the top of the screen.
+        Returns the slot's placement."""
+        placement, forest_trees = self.course.next_slot()
+        self.place(placement)
+        for tree_x, offset, tree_type in forest_trees:
+            self.place(('tree', tree_x, tree_type), -offset)
+        return placement
+
+    def place(self, placement, y_offset=0):
+        """Adds a course placement `y_offset` pixels below its spawn row (None places nothing).
+
+        Gates must be placed bottom to top: the gate deque is ordered by height.
+        """
+        if placement is None:
+            return
+        if placement[0] == 'tree':
+            _, tree_x, tree_type = placement
+            if self.tree_store is not None:
+                self.tree_store.add(tree_x, -OBSTACLE_HEIGHT + y_offset, tree_type)
+                return
+            tree = self.tree_pool.acquire(tree_x, -OBSTACLE_HEIGHT + y_offset, self.scroll_speed, tree_type)
+            self.tree_index.insert(tree, tree.rect.y - self.scroll_px)
+            self.obstacles.add(tree)
+            self.all_game_sprites.add(tree)
+        else: # Flag pair
+            _, left_flag_inner_x, right_flag_inner_x = placement
+            gate = self.gate_pool.acquire(left_flag_inner_x, right_flag_inner_x, -FLAG_HEIGHT + y_offset, self.scroll_speed)
+            self.flags.add(gate.left_flag, gate.right_flag)
+            self.all_game_sprites.add(gate.left_flag, gate.right_flag)
+            self.gates.append(gate) # Newest gate is highest on screen
+
+    def hit_tree(self):
+        """Pixel-exact test of the player's current pose against nearby trees only."""
+        player = self.player
+        band = player.image_rect
+        if self.tree_store is not None:
+            return self.tree_store.hits(player.mask, band)
+        # Trees whose top lies within a tree's height above the player's image could
+        # overlap it; one extra pixel each way covers exact-half rounding of the scroll
+        world_top = band.top - OBSTACLE_HEIGHT - self.scroll_px - 1
+        world_bottom = band.bottom - self.scroll_px + 1
+        for tree in self.tree_index.query(world_top, world_bottom):
+            if player.mask.overlap(tree.mask, (tree.rect.x - band.x, tree.rect.y - band.y)):
+                return True
+        return False
+
+    def pool_stats(self):
+        """Pool hit/allocation counters for trees and gates (two flags each)."""
+        return {'trees': self.tree_pool.stats(), 'gates': self.gate_pool.stats()}
+
+    def step(self):
+        """Advances the game by one tick. Returns a list of (event, value) tuples.
+
+        Events: 'spawn' (the placement), 'tree_hit', 'gate_passed' (new score),
+        'gate_missed', 'speed_up' (new speed).
+        """
+        events = []
+        if self.game_over:
+            return events
+        self.ticks += 1
+        prof = self.profiler
+
+        # Spawn obstacles
+        if self.ticks - self.last_spawn_tick >= OBSTACLE_SPAWN_TICKS:
+            self.last_spawn_tick = self.ticks
+            placement = self.spawn()
+            if placement is not None:
+                events.append(('spawn', placement))
+        if prof: prof.lap('spawn')
+
+        # Update Player, Obstacles and Flags
+        left, right = self.input_source()
+        self.input_log.append(left, right)
+        self.player.update(left, right)
+        if prof: prof.lap('player')
+        self.obstacles.update(self.scroll_speed)
+        self.flags.update(self.scroll_speed)
+        if self.tree_store is not None:
+            self.tree_store.scroll(self.scroll_speed)
+        self.scroll_step = round_half_away(self.scroll_speed) # What each Rect just moved
+        self.scroll_px += self.scroll_step
+        if prof: prof.lap('groups')
+
+        # --- Collision Detection ---
+        player = self.player
+        # Trees
+        if self.hit_tree():
+            events.append(('tree_hit', None))
+            self.game_over = True
+            self.game_over_reason = 'tree'
+        if prof: prof.lap('trees')
+        # Gates: retire gates that have scrolled past the player's row, then check only
+        # the gate(s) currently level with the player.
+        player_y = player.rect.centery
+        gates = self.gates
+        while gates and gates[0].rect.top >= player_y:
+            gates.popleft()
+        for gate in gates:
+            if self.game_over or gate.rect.bottom <= player_y: break # The rest are higher up
+            if gate.passed: continue
+            if gate.is_between(player.rect):
+                self.score += 10
+                self.gates_passed += 1
+                gate.mark_passed()
+                events.append(('gate_passed', self.score))
+            else:
+                gate.missed = True
+                events.append(('gate_missed', None))
+                self.game_over = True
+                self.game_over_reason = 'gate'
+
+        # --- Speed Increase ---
+        if self.score >= self.next_speed_increase_threshold:
+            self.scroll_speed *= (1.0 + SPEED_INCREASE_PERCENT)
+            self.max_scroll_speed = max(self.max_scroll_speed, self.scroll_speed)
+            self.next_speed_increase_threshold += 100
+            events.append(('speed_up', self.scroll_speed))
+        if prof: prof.lap('gates')
+        return events
+
+    def run(self, max_ticks=None):
+        """Steps until game over (or max_ticks). Returns the final score."""
+        while not self.game_over and (max_ticks is None or self.ticks < max_ticks):
+            self.step()
+        return self.score
+
+    def close(self):
+        """Stops the course worker thread, if there is one."""
+        self.course.close()
+
+# --- Replays ---
+# File layout: header (magic, version, seed, ticks, final score, forest), the encoded InputLog,
+# then a CRC32 of everything before it.
+REPLAY_MAGIC = b"SKIR"
+REPLAY_VERSION = 4 # Bumped whenever the game rules change; older replays no longer verify
+_REPLAY_HEADER = struct.Struct("<4sBQIIH")
+_REPLAY_CRC = struct.Struct("<I")
+
+class Replay:
+    """A recorded run: seed, tick count, final score, forest difficulty and the per-tick input log."""
+    def __init__(self, seed, ticks, score, input_log, forest=0):
+        self.seed = seed
+        self.ticks = ticks
+        self.score = score
+        self.input_log = input_log
+        self.forest = forest
+
+    @classmethod
+    def from_simulation(cls, sim):
+        return cls(sim.seed, sim.ticks, sim.score, sim.input_log, sim.forest)
+
+    def simulation(self):
+        """Returns a fresh SkiSimulation driven by this replay's inputs."""
+        return SkiSimulation(input_source=self.input_log.playback(), seed=self.seed, forest=self.forest)
+
+def encode_replay(replay):
+    """The replay file's bytes."""
+    data = _REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, replay.seed, replay.ticks, replay.score,
+                                replay.forest)
+    data += replay.input_log.encode()
+    return data + _REPLAY_CRC.pack(zlib.crc32(data))
+
+def save_replay(path, replay):
+    """Writes a replay file atomically, creating its directory if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_file_atomically(path, encode_replay(replay))
+
+def load_replay(path):
+    """Reads a replay file. Raises ValueError if it is not a valid replay."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _REPLAY_HEADER.size + _REPLAY_CRC.size:
+        raise ValueError(f"{path}: too short to be a replay")
+    body, (crc,) = data[:-_REPLAY_CRC.size], _REPLAY_CRC.unpack(data[-_REPLAY_CRC.size:])
+    magic, version, seed, ticks, score, forest = _REPLAY_HEADER.unpack_from(body)
+    if magic != REPLAY_MAGIC:
+        raise ValueError(f"{path}: not a replay file")
+    if version != REPLAY_VERSION:
+        raise ValueError(f"{path}: recorded with replay version {version}, this game reads version {REPLAY_VERSION}")
+    if zlib.crc32(body) != crc:
+        raise ValueError(f"{path}: checksum mismatch")
+    input_log = InputLog.decode(body[_REPLAY_HEADER.size:])
+    if len(input_log) != ticks:
+        raise ValueError(f"{path}: input log has {len(input_log)} ticks, header says {ticks}")
+    return Replay(seed, ticks, score, input_log, forest)
+
+def verify_replay(path):
+    """Re-simulates a replay headless. Returns (replay, simulated_score)."""
+    replay = load_replay(path)
+    sim = replay.simulation()
+    return replay, sim.run(max_ticks=replay.ticks)
+
+# --- Frame Profiler ---
+class FrameProfiler:
+    """Times each phase of a frame and keeps rolling p50/p95/p99 per phase.
+
+    Call begin_frame() at the top of the loop, lap(phase) after each phase (the time
+    since the previous lap is charged to `phase`) and end_frame() at the bottom. If
+    `output_path` ends in .csv or .jsonl, one record per frame is appended to it, so
+    toggling the profiler off and on keeps what was recorded before.
+    """
+    PHASES = ('events', 'spawn', 'player', 'groups', 'parallax', 'trees', 'gates',
+              'draw_bg', 'draw_sprites', 'draw_player', 'draw_fg', 'draw_ui', 'overlay',
+              'flip', 'idle')
+    OVERLAY_REFRESH_FRAMES = 30 # Re-render the overlay text twice a second at 60 FPS
+
+    def __init__(self, window=240, output_path=None):
+        self.history = {phase: deque(maxlen=window) for phase in self.PHASES + ('frame',)}
+        self.current = dict.fromkeys(self.PHASES, 0.0)
+        self.frame_index = 0
+        self._frame_start = self._last = time.perf_counter()
+        self._overlay = None
+        self.output = None
+        self.output_format = None
+        if output_path:
+            self.output_format = 'csv' if output_path.endswith('.csv') else 'jsonl'
+            self.output = open(output_path, 'a', buffering=1 << 16)
+            if self.output_format == 'csv' and self.output.tell() == 0:
+                self.output.write(','.join(('frame', 'state', 'frame_ms') + self.PHASES) + '\n')
+
+    def begin_frame(self):
+        for phase in self.current:
+            self.current[phase] = 0.0
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += (now - self._last) * 1000.0
+        self._last = now
+
+    def end_frame(self, state=None):
+        frame_ms = (self._last - self._frame_start) * 1000.0
+        for phase, ms in self.current.items():
+            self.history[phase].append(ms)
+        self.history['frame'].append(frame_ms)
+        if self.output is not None:
+            if self.output_format == 'csv':
+                values = ','.join(f"{self.current[phase]:.4f}" for phase in self.PHASES)
+                self.output.write(f"{self.frame_index},{state},{frame_ms:.4f},{values}\n")
+            else:
+                record = {'frame': self.frame_index, 'state': state, 'frame_ms': round(frame_ms, 4)}
+                record.update((phase, round(ms, 4)) for phase, ms in self.current.items())
+                self.output.write(json.dumps(record) + '\n')
+        self.frame_index += 1
+
+    def percentiles(self, phase):
+        """Returns (p50, p95, p99) in milliseconds over the rolling window."""
+        samples = sorted(self.history[phase])
+        if not samples:
+            return 0.0, 0.0, 0.0
+        last = len(samples) - 1
+        return tuple(samples[min(last, int(q * len(samples)))] for q in (0.50, 0.95, 0.99))
+
+    def draw_overlay(self, surface):
+        """Draws the p50/p95/p99 table in the top-right corner."""
+        if self._overlay is None or self.frame_index % self.OVERLAY_REFRESH_FRAMES == 0:
+            font = get_font('profiler')
+            rows = [('phase', 'p50', 'p95', 'p99')]
+            for phase in ('frame',) + self.PHASES:
+                rows.append((phase,) + tuple(f"{ms:.2f}" for ms in self.percentiles(phase)))
+            column_x = (5, 100, 150, 200) # Proportional font, so place each column
+            line_height = font.get_linesize()
+            self._overlay = pygame.Surface((column_x[-1] + 50, line_height * len(rows) + 8))
+            self._overlay.set_alpha(190)
+            for i, row in enumerate(rows):
+                for x, cell in zip(column_x, row):
+                    self._overlay.blit(font.render(cell, True, WHITE), (x, 4 + i * line_height))
+        surface.blit(self._overlay, (surface.get_width() - self._overlay.get_width() - 5, 5))
+
+    def close(self):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+# --- Frame Pacing and Input Latency ---
+class FramePacer:
+    """Ends each frame on a fixed cadence of `fps` frames per second (0 = uncapped).
+
+    "sleep" uses Clock.tick, whose OS sleeps can overshoot by several milliseconds.
+    "busy" uses Clock.tick_busy_loop, exact but it keeps a core spinning. "hybrid"
+    sleeps until HYBRID_SPIN_MS before the deadline and spins the rest, so frames end
+    within a fraction of a millisecond for little CPU. wait() returns the ms waited.
+    """
+    MODES = ('sleep', 'busy', 'hybrid')
+    HYBRID_SPIN_MS = 2.0
+
+    def __init__(self, fps, mode='hybrid'):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown pacing mode {mode!r} (expected one of {', '.join(self.MODES)})")
+        self.fps = fps
+        self.mode = mode
+        self.clock = pygame.time.Clock()
+        self.deadline = None
+
+    def wait(self):
+        if self.mode == 'sleep':
+            return self.clock.tick(self.fps) - self.clock.get_rawtime()
+        if self.mode == 'busy':
+            return self.clock.tick_busy_loop(self.fps) - self.clock.get_rawtime()
+        start = time.perf_counter()
+        if not self.fps:
+            return 0.0
+        period = 1.0 / self.fps
+        if self.deadline is None or start - self.deadline > period:
+            self.deadline = start # First frame, or too far behind to catch up: resync
+        self.deadline += period
+        sleep_for = self.deadline - start - self.HYBRID_SPIN_MS / 1000.0
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+        while time.perf_counter() < self.deadline:
+            pass
+        return (time.perf_counter() - start) * 1000.0
+
+class InputLatencyMeter:
+    """Key-to-photon latency histogram for the steering keys.
+
+    key_changed() is called when the event pump delivers a steering key press or
+    release, presented() after each frame is shown. The first present after a
+    simulation tick that read the new key state ends the sample, so it covers the wait
+    for the next tick, the draw and the present. Press times are when the game first
+    sees the key; time spent in the OS queue before the pump is not included.
+    """
+    BUCKET_MS = 4
+    BUCKETS = 16 # The last bucket also counts everything slower
+    OVERLAY_REFRESH_FRAMES = 30
+
+    def __init__(self, window=240):
+        self.counts = [0] * self.BUCKETS
+        self.samples = deque(maxlen=window)
+        self.pending = None # (seen at, tick when seen) of the oldest unshown key change
+        self.frames = 0
+        self._overlay = None
+
+    def key_changed(self, when, tick):
+        if self.pending is None:
+            self.pending = (when, tick)
+
+    def presented(self, when, tick):
+        if self.pending is not None and tick != self.pending[1]:
+            if tick > self.pending[1]:
+                self.record((when - self.pending[0]) * 1000.0)
+            self.pending = None # Otherwise a new game started before the change showed
+        self.frames += 1
+
+    def record(self, ms):
+        self.samples.append(ms)
+        self.counts[min(self.BUCKETS - 1, int(ms // self.BUCKET_MS))] += 1
+
+    def percentiles(self):
+        """Returns (p50, p95, max) in milliseconds over the rolling window."""
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0, 0.0, 0.0
+        return samples[len(samples) // 2], samples[min(len(samples) - 1, int(0.95 * len(samples)))], samples[-1]
+
+    def draw_overlay(self, surface):
+        """Draws the histogram in the bottom-right corner, one bar per bucket."""
+        if self._overlay is None or self.frames % self.OVERLAY_REFRESH_FRAMES == 0:
+            font = get_font('profiler')
+            line_height = font.get_linesize()
+            bar_width, bar_height = 12, 60
+            p50, p95, worst = self.percentiles()
+            title = font.render(f"key-to-photon ms  p50 {p50:.1f}  p95 {p95:.1f}  max {worst:.1f}", True, WHITE)
+            width = max(self.BUCKETS * bar_width, title.get_width()) + 10
+            self._overlay = pygame.Surface((width, bar_height + 2 * line_height + 12))
+            self._overlay.set_alpha(190)
+            self._overlay.blit(title, (5, 4))
+            peak = max(self.counts) or 1
+            base = line_height + 6 + bar_height
+            for i, count in enumerate(self.counts):
+                height = round(bar_height * count / peak)
+                self._overlay.fill(WHITE, (5 + i * bar_width, base - height, bar_width - 2, height))
+            for bucket, label in ((0, "0"), (self.BUCKETS // 2, str(self.BUCKET_MS * self.BUCKETS // 2)),
+                                  (self.BUCKETS - 1, f"{self.BUCKET_MS * (self.BUCKETS - 1)}+")):
+                self._overlay.blit(font.render(label, True, WHITE), (5 + bucket * bar_width, base + 4))
+        surface.blit(self._overlay, (surface.get_width() - self._overlay.get_width() - 5,
+                                     surface.get_height() - self._overlay.get_height() - 5))
+
+# --- Startup Timing ---
+class StartupTimer:
+    """Wall-clock time spent in each phase of a launch, printed by --startup-report."""
+    def __init__(self, start):
+        self.start = self.last = start
+        self.phases = []
+
+    def mark(self, phase):
+        """Ends `phase` now; it covers the time since the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000.0))
+        self.last = now
+
+    def report(self):
+        lines = ["Startup time by phase:"]
+        lines += [f"  {phase:<12} {ms:8.1f} ms" for phase, ms in self.phases]
+        lines.append(f"  {'total':<12} {(self.last - self.start) * 1000.0:8.1f} ms")
+        return "\n".join(lines)
 
 # --- Parallax Background Layer ---
 class ParallaxLayer:
     """Represents a single layer for parallax scrolling."""
-    def __init__(self, image, speed_factor):
+    def __init__(self, image, speed_factor, height=None):
+        # `image` may be None for a layer restored from the background cache, which only
+        # has its prepared (compact) form; `height` then gives the tiling height
         self.image = image
         self.speed_factor = speed_factor
-        self.height = self.image.get_height()
+        self.height = self.image.get_height() if image is not None else height
         # Ensure height is at least screen height for proper tiling
         if self.height < SCREEN_HEIGHT:
              print(f"Warning: Parallax image height ({self.height}) is less than screen height ({SCREEN_HEIGHT}). May cause gaps.")
              # Optionally resize or tile the image here if needed, but for now just warn.
         self.y1 = 0
         self.y2 = -self.height # Position second image directly above the first
+        self.last_move = 0.0 # Distance moved by the last update(), for interpolation
+        # Set by prepare(): the trimmed display-format surface and where it sits in the image
+        self.compact = None
+        self.compact_offset = (0, 0)
+
+    def prepare(self):
+        """Pre-converts the layer to the display format for the fast renderer.
+
+        Opaque layers are converted as-is. Layers with per-pixel alpha are trimmed to
+        their visible bounding box; if every visible pixel shares one alpha value (solid
+        hills, snow dots, flat clouds) they become an RLE-accelerated colorkey surface
+        with surface alpha, otherwise a convert_alpha() copy. Requires a display mode.
+        """
+        if not self.image.get_flags() & pygame.SRCALPHA:
+            self.compact = self.image.convert()
+            self.compact_offset = (0, 0)
+            return
+        bounds = self.image.get_bounding_rect()
+        trimmed = self.image.subsurface(bounds).copy()
+        alpha = _uniform_alpha(trimmed)
+        if alpha is None:
+            self.compact = trimmed.convert_alpha()
+        else:
+            # Transparent pixels are (0, 0, 0, 0): force alpha to 255 and key them out
+            trimmed.fill((0, 0, 0, 255), special_flags=pygame.BLEND_RGBA_MAX)
+            self.compact = trimmed.convert()
+            self.compact.set_colorkey(BLACK, pygame.RLEACCEL)
+            if alpha < 255:
+                self.compact.set_alpha(alpha, pygame.RLEACCEL)
+        self.compact_offset = bounds.topleft
 
     def update(self, scroll_speed):
         """Updates the layer's position."""
         move_speed = scroll_speed * self.speed_factor
+        self.last_move = move_speed
         self.y1 += move_speed
         self.y2 += move_speed
 
@@ -250,284 +1711,875 @@ class ParallaxLayer:
              self.y2 = self.y1 + self.height
 
 
-    def draw(self, surface):
-        """Draws the layer (two copies for seamless scrolling)."""
-        surface.blit(self.image, (0, int(self.y1)))
-        surface.blit(self.image, (0, int(self.y2)))
+    def draw(self, surface, alpha=1.0):
+        """Draws the layer (two copies for seamless scrolling).
+
+        `alpha` places the layer that fraction of the way through its last update, so
+        frames rendered between simulation ticks move smoothly. The copies are laid out
+        from the wrapped position, which keeps them seamless even mid-wrap.
+        """
+        y = int((self.y1 + (alpha - 1.0) * self.last_move) % self.height)
+        if self.compact is not None:
+            self._draw_compact(surface, y)
+            self._draw_compact(surface, y - self.height)
+            return
+        surface.blit(self.image, (0, y))
+        surface.blit(self.image, (0, y - self.height))
+
+    def _draw_compact(self, surface, y):
+        """Blits only the on-screen rows of the compact surface for the copy at `y`."""
+        offset_x, offset_y = self.compact_offset
+        top = y + offset_y
+        src_top = max(0, -top)
+        src_bottom = min(self.compact.get_height(), surface.get_height() - top)
+        if src_bottom > src_top:
+            area = pygame.Rect(0, src_top, self.compact.get_width(), src_bottom - src_top)
+            surface.blit(self.compact, (offset_x, top + src_top), area)
+
+def _uniform_alpha(image):
+    """Returns the alpha shared by every visible pixel of `image`, or None if they differ."""
+    visible = pygame.mask.from_surface(image, 0)
+    count = visible.count()
+    if count == 0:
+        return 255
+    alpha = image.get_at(visible.outline()[0]).a
+    at_least = pygame.mask.from_surface(image, alpha - 1).count()
+    above = pygame.mask.from_surface(image, alpha).count()
+    return alpha if at_least == count and above == 0 else None
 
 # --- Game Initialization ---
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Horace Skis Again! - Clouds!")
-clock = pygame.time.Clock()
-# Fonts
-title_font = pygame.font.Font(None, 80)
-score_font = pygame.font.Font(None, 36)
-info_font = pygame.font.Font(None, 28)
-game_over_font = pygame.font.Font(None, 74)
-restart_font = pygame.font.Font(None, 50)
-
-# --- Create Parallax Background Layers ---
-# Layer 1: Distant Mountains (slowest)
-bg_layer1_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-bg_layer1_surf.fill(SKY_BLUE) # Base sky
-pygame.draw.polygon(bg_layer1_surf, MOUNTAIN_COLOR_FAR, [(0, 400), (200, 150), (450, 300), (600, 100), (SCREEN_WIDTH, 350), (SCREEN_WIDTH, SCREEN_HEIGHT), (0, SCREEN_HEIGHT)])
-parallax_layer1 = ParallaxLayer(bg_layer1_surf, 0.1)
-
-# Layer 2: Closer Hills (medium speed)
-bg_layer2_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA) # Transparent surface
-pygame.draw.polygon(bg_layer2_surf, MOUNTAIN_COLOR_NEAR, [(0, 500), (150, 300), (350, 450), (550, 250), (700, 480), (SCREEN_WIDTH, 400), (SCREEN_WIDTH, SCREEN_HEIGHT), (0, SCREEN_HEIGHT)])
-parallax_layer2 = ParallaxLayer(bg_layer2_surf, 0.3)
-
-# Layer 3: Snow Ground Texture (fastest - same speed as obstacles)
-# *** MODIFIED: Use transparent surface with dots ***
-bg_layer3_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-# bg_layer3_surf.fill(SNOW_COLOR) # Remove solid fill
-# Draw some random dots for texture
-for _ in range(200): # Adjust number of dots for density
-    x = random.randint(0, SCREEN_WIDTH)
-    y = random.randint(0, SCREEN_HEIGHT)
-    radius = random.randint(1, 2)
-    pygame.draw.circle(bg_layer3_surf, GREY, (x, y), radius)
-parallax_layer3 = ParallaxLayer(bg_layer3_surf, 1.0) # Scrolls at base speed
-
-# *** NEW: Layer 4: Clouds (Foreground) ***
-bg_layer4_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-# Draw some random cloud shapes (overlapping circles)
-for _ in range(15): # Number of cloud puffs
-    center_x = random.randint(0, SCREEN_WIDTH)
-    center_y = random.randint(0, SCREEN_HEIGHT // 2) # Clouds higher up
-    base_radius = random.randint(20, 50)
-    # Draw a few overlapping circles for one cloud puff
-    for i in range(random.randint(3, 6)):
-        offset_x = random.randint(-base_radius // 2, base_radius // 2)
-        offset_y = random.randint(-base_radius // 2, base_radius // 2)
-        radius = random.randint(base_radius // 2, base_radius)
-        pygame.draw.circle(bg_layer4_surf, CLOUD_COLOR, (center_x + offset_x, center_y + offset_y), radius)
-parallax_layer4_clouds = ParallaxLayer(bg_layer4_surf, 1.2) # Faster than ground speed
-
-# Order layers for drawing (back to front, clouds separate for foreground)
-background_parallax_layers = [parallax_layer1, parallax_layer2, parallax_layer3]
-foreground_parallax_layers = [parallax_layer4_clouds]
-
-
-# --- Sprite Groups ---
-all_game_sprites = pygame.sprite.Group() # Sprites active during gameplay (player, obstacles, flags)
-obstacles = pygame.sprite.Group()
-flags = pygame.sprite.Group()
-
-# Create the player (will be added to group when game starts)
-player = Player()
-
-# --- Game Variables ---
-game_state = STATE_START_SCREEN
-score = 0
-last_score = None # Initialize last_score
-high_scores = load_high_scores()
-current_scroll_speed = INITIAL_SCROLL_SPEED
-next_speed_increase_threshold = 100 # Score needed for next speed increase
-last_obstacle_spawn_time = 0
-obstacle_spawn_delay = 800
-
-# --- Function to Reset Game ---
-def reset_game():
-    """Resets game variables and sprites for a new game."""
-    global score, current_scroll_speed, next_speed_increase_threshold, last_obstacle_spawn_time
-    score = 0
-    current_scroll_speed = INITIAL_SCROLL_SPEED
-    next_speed_increase_threshold = 100
-    last_obstacle_spawn_time = pygame.time.get_ticks() # Reset spawn timer
-    all_game_sprites.empty()
-    obstacles.empty()
-    flags.empty()
-    player.reset_position()
-    all_game_sprites.add(player)
+# Display, clock, fonts and backgrounds are created on demand by main() so the module
+# (and the simulation above) can be imported without opening a window or drawing.
+screen = None
+pacer = None
+FONT_SIZES = {'title': 80, 'score': 36, 'info': 28, 'game_over': 74, 'restart': 50, 'profiler': 20}
+fonts = {}
 
-# --- Function to Draw Start Screen ---
-def draw_start_screen(surface, scores, last):
-    # (Drawing code remains the same)
+def parse_display_settings():
+    """Sets WINDOW_SIZE and TARGET_FPS from SKI_WINDOW and SKI_FPS; exits if either is malformed.
+
+    Parsed here rather than at import, so a bad value can't stop `import ski` (the bots,
+    tools and tests never open a window).
+    """
+    global WINDOW_SIZE, TARGET_FPS
+    try:
+        width, height = (int(n) for n in WINDOW_SETTING.lower().split("x"))
+        if width <= 0 or height <= 0:
+            raise ValueError
+    except ValueError:
+        print(f"Invalid SKI_WINDOW {WINDOW_SETTING!r} (expected WIDTHxHEIGHT, e.g. 1600x1200)")
+        sys.exit(2)
+    try:
+        fps = int(FPS_SETTING)
+        if fps < 0:
+            raise ValueError
+    except ValueError:
+        print(f"Invalid SKI_FPS {FPS_SETTING!r} (expected frames per second, or 0 for uncapped)")
+        sys.exit(2)
+    WINDOW_SIZE, TARGET_FPS = (width, height), fps
+
+def init_display():
+    """Opens the window and creates the frame pacer.
+
+    Only the display subsystem is started; fonts are loaded by get_font() when first
+    drawn and nothing here touches audio or joysticks. Under the GPU renderer `screen`
+    is a GpuCanvas, which the draw code blits to exactly like a display surface.
+    """
+    global screen, pacer
+    parse_display_settings()
+    pygame.display.init()
+    pacer = FramePacer(TARGET_FPS, PACING_MODE)
+    if RENDERER_MODE == "gpu":
+        screen = GpuCanvas.open("Horace Skis Again! - Clouds!", WINDOW_SIZE, FULLSCREEN, SCALE_MODE, VSYNC)
+        return # Surfaces are uploaded as textures as they are drawn, so nothing to convert
+    screen = None
+    if VSYNC:
+        # pygame only honours vsync for SCALED (or OpenGL) windows; the logical size
+        # stays 800x600, so the draw code is unchanged
+        try:
+            screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+        except pygame.error as e:
+            print(f"Vsync unavailable ({e}), continuing without it")
+    if screen is None:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Horace Skis Again! - Clouds!")
+    # Shared tree/flag images in the display format for fast blits
+    get_sprite_cache().convert()
+
+def present_display():
+    """Shows the finished frame."""
+    if RENDERER_MODE == "gpu":
+        screen.present()
+    else:
+        pygame.display.flip()
+
+def display_format(surface, alpha=False):
+    """`surface` converted to the display's pixel format for fast blits, or unchanged
+    when there is no display surface (the GPU renderer uploads it as a texture)."""
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if alpha else surface.convert()
+
+def get_font(name):
+    """Returns the named UI font (see FONT_SIZES), loading it on first use."""
+    font = fonts.get(name)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = fonts[name] = pygame.font.Font(None, FONT_SIZES[name])
+    return font
+
+# --- GPU Renderer ---
+def fit_rect(window_size, scale_mode="aspect"):
+    """Where the 800x600 frame goes in a window: centred, as large as fits, 4:3 kept.
+    In "integer" mode the scale is rounded down to a whole multiple (when it is >= 1)."""
+    window_w, window_h = window_size
+    scale = min(window_w / SCREEN_WIDTH, window_h / SCREEN_HEIGHT)
+    if scale_mode == "integer" and scale >= 1:
+        scale = math.floor(scale)
+    width, height = round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale)
+    return pygame.Rect((window_w - width) // 2, (window_h - height) // 2, width, height)
+
+class GpuCanvas:
+    """Stands in for the 800x600 display surface under the SDL2 GPU renderer.
+
+    The draw path only blits, so blit() and blits() draw textures into an 800x600 target
+    texture and present() scales that to the window. Each source surface is uploaded
+    once (subsurfaces share their parent's texture, so the sprite atlas is one texture)
+    and its texture is dropped when the surface is garbage collected. Compositing and
+    scaling happen on the GPU, so the CPU cost doesn't grow with the window size.
+    """
+    def __init__(self, window, renderer, scale_mode="aspect"):
+        from pygame._sdl2.video import Texture
+        self.window = window
+        self.renderer = renderer
+        self.scale_mode = scale_mode
+        self._upload = Texture.from_surface
+        # Sampling used when the frame is scaled to the window (read at texture creation)
+        os.environ["SDL_RENDER_SCALE_QUALITY"] = "nearest" if scale_mode == "integer" else "linear"
+        self.target = Texture(renderer, (SCREEN_WIDTH, SCREEN_HEIGHT), target=True)
+        os.environ["SDL_RENDER_SCALE_QUALITY"] = "nearest" # Sprites are drawn 1:1
+        self.textures = weakref.WeakKeyDictionary() # Source surface -> Texture
+        renderer.target = self.target
+
+    @classmethod
+    def open(cls, title, size, fullscreen=False, scale_mode="aspect", vsync=False):
+        """Opens a resizable window with a renderer (accelerated when available)."""
+        from pygame._sdl2.video import Window, Renderer
+        window = Window(title, size=size, resizable=True, fullscreen_desktop=fullscreen)
+        return cls(window, Renderer(window, accelerated=-1, vsync=vsync), scale_mode)
+
+    def get_width(self):
+        return SCREEN_WIDTH
+
+    def get_height(self):
+        return SCREEN_HEIGHT
+
+    def get_size(self):
+        return SCREEN_WIDTH, SCREEN_HEIGHT
+
+    def texture(self, surface):
+        """The texture holding `surface` (its top-level parent's, for a subsurface)."""
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = self.textures[surface] = self._upload(self.renderer, surface)
+        return texture
+
+    def blit(self, source, dest, area=None):
+        parent = source.get_abs_parent()
+        offset_x, offset_y = source.get_abs_offset()
+        src = source.get_rect() if area is None else pygame.Rect(area).clip(source.get_rect())
+        src.move_ip(offset_x, offset_y)
+        self.texture(parent).draw(srcrect=src, dstrect=(dest[0], dest[1], src.width, src.height))
+
+    def blits(self, blit_sequence, doreturn=True):
+        for item in blit_sequence:
+            self.blit(*item)
+
+    def present(self):
+        renderer = self.renderer
+        renderer.target = None
+        renderer.draw_color = (0, 0, 0, 255) # Letterbox bars
+        renderer.clear()
+        self.target.draw(dstrect=fit_rect(self.window.size, self.scale_mode))
+        renderer.present()
+        renderer.target = self.target
+
+# --- Parallax Background Layers ---
+BACKGROUND_SPEED_FACTORS = (0.1, 0.3, 1.0, 1.2) # Far mountains, hills, snow, clouds
+QUALITY_LAYER_SOURCES = (3, 0, 2) # Flat clouds, merged mountains and hills, sparse snow scroll like these
+BACKGROUND_CACHE_FACTORS = BACKGROUND_SPEED_FACTORS + tuple(BACKGROUND_SPEED_FACTORS[i] for i in QUALITY_LAYER_SOURCES)
+BACKGROUND_CACHE_MAGIC = b"SKBG"
+BACKGROUND_CACHE_VERSION = 2 # Bump whenever the layer drawing or prepare() changes
+BACKGROUND_CACHE_HEADER = struct.Struct("<4sBQHHB") # magic, version, seed, width, height, layers
+BACKGROUND_CACHE_LAYER = struct.Struct("<hhHHBBI") # offset x/y, size, mode, alpha, compressed size
+LAYER_OPAQUE, LAYER_COLORKEY, LAYER_PER_PIXEL_ALPHA = range(3)
+
+background_parallax_layers = [] # Drawn behind the sprites at the current quality tier
+foreground_parallax_layers = []
+parallax_layers = [] # Every layer, drawn or not, so all of them stay in step
+
+def draw_background_surfaces(seed, snow_dots=200):
+    """Procedurally draws the four parallax surfaces for a background seed."""
+    background_rng = subsystem_rng(seed, 'background') # Snow dots and clouds
+    # Layer 1: Distant Mountains (slowest)
+    bg_layer1_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    bg_layer1_surf.fill(SKY_BLUE) # Base sky
+    pygame.draw.polygon(bg_layer1_surf, MOUNTAIN_COLOR_FAR, [(0, 400), (200, 150), (450, 300), (600, 100), (SCREEN_WIDTH, 350), (SCREEN_WIDTH, SCREEN_HEIGHT), (0, SCREEN_HEIGHT)])
+
+    # Layer 2: Closer Hills (medium speed)
+    bg_layer2_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA) # Transparent surface
+    pygame.draw.polygon(bg_layer2_surf, MOUNTAIN_COLOR_NEAR, [(0, 500), (150, 300), (350, 450), (550, 250), (700, 480), (SCREEN_WIDTH, 400), (SCREEN_WIDTH, SCREEN_HEIGHT), (0, SCREEN_HEIGHT)])
+
+    # Layer 3: Snow Ground Texture (fastest - same speed as obstacles)
+    # *** MODIFIED: Use transparent surface with dots ***
+    bg_layer3_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    # Draw some random dots for texture
+    for _ in range(snow_dots): # Adjust number of dots for density
+        x = background_rng.randint(0, SCREEN_WIDTH)
+        y = background_rng.randint(0, SCREEN_HEIGHT)
+        radius = background_rng.randint(1, 2)
+        pygame.draw.circle(bg_layer3_surf, GREY, (x, y), radius)
+
+    # *** NEW: Layer 4: Clouds (Foreground) ***
+    bg_layer4_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    # Draw some random cloud shapes (overlapping circles)
+    for _ in range(15): # Number of cloud puffs
+        center_x = background_rng.randint(0, SCREEN_WIDTH)
+        center_y = background_rng.randint(0, SCREEN_HEIGHT // 2) # Clouds higher up
+        base_radius = background_rng.randint(20, 50)
+        # Draw a few overlapping circles for one cloud puff
+        for i in range(background_rng.randint(3, 6)):
+            offset_x = background_rng.randint(-base_radius // 2, base_radius // 2)
+            offset_y = background_rng.randint(-base_radius // 2, base_radius // 2)
+            radius = background_rng.randint(base_radius // 2, base_radius)
+            pygame.draw.circle(bg_layer4_surf, CLOUD_COLOR, (center_x + offset_x, center_y + offset_y), radius)
+    return [bg_layer1_surf, bg_layer2_surf, bg_layer3_surf, bg_layer4_surf]
+
+def encode_prepared_layers(seed, layers):
+    """Serializes the prepared (compact) form of each layer with a CRC32 trailer.
+
+    Drawing the layers is cheap; analysing and converting them in prepare() is what
+    costs at startup, so the cache holds prepare()'s output: the four layers followed
+    by the quality-tier variants.
+    """
+    parts = [BACKGROUND_CACHE_HEADER.pack(BACKGROUND_CACHE_MAGIC, BACKGROUND_CACHE_VERSION, seed,
+                                          SCREEN_WIDTH, SCREEN_HEIGHT, len(layers))]
+    for layer in layers:
+        compact = layer.compact
+        alpha = compact.get_alpha()
+        if compact.get_colorkey() is not None: # Checked first: surface alpha also sets SRCALPHA
+            mode, pixels = LAYER_COLORKEY, pygame.image.tobytes(compact, "RGB")
+        elif compact.get_flags() & pygame.SRCALPHA:
+            mode, pixels = LAYER_PER_PIXEL_ALPHA, pygame.image.tobytes(compact, "RGBA")
+        else:
+            mode, pixels = LAYER_OPAQUE, pygame.image.tobytes(compact, "RGB")
+        pixels = zlib.compress(pixels, 1)
+        parts.append(BACKGROUND_CACHE_LAYER.pack(*layer.compact_offset, *compact.get_size(), mode,
+                                                 255 if alpha is None else alpha, len(pixels)))
+        parts.append(pixels)
+    data = b"".join(parts)
+    return data + struct.pack("<I", zlib.crc32(data))
+
+def decode_prepared_layers(data, seed):
+    """Inverse of encode_prepared_layers(); raises ValueError on a stale or damaged cache.
+
+    Returns ParallaxLayers that only have their compact form. Requires a display mode.
+    """
+    if len(data) < BACKGROUND_CACHE_HEADER.size + 4:
+        raise ValueError("truncated background cache")
+    body, (crc,) = data[:-4], struct.unpack("<I", data[-4:])
+    if zlib.crc32(body) != crc:
+        raise ValueError("background cache checksum mismatch")
+    magic, version, cached_seed, width, height, count = BACKGROUND_CACHE_HEADER.unpack_from(body)
+    if magic != BACKGROUND_CACHE_MAGIC or version != BACKGROUND_CACHE_VERSION:
+        raise ValueError("not a current background cache")
+    if (cached_seed, width, height, count) != (seed, SCREEN_WIDTH, SCREEN_HEIGHT, len(BACKGROUND_CACHE_FACTORS)):
+        raise ValueError("background cache is for another seed or screen size")
+    layers = []
+    offset = BACKGROUND_CACHE_HEADER.size
+    for speed_factor in BACKGROUND_CACHE_FACTORS:
+        x, y, w, h, mode, alpha, size = BACKGROUND_CACHE_LAYER.unpack_from(body, offset)
+        offset += BACKGROUND_CACHE_LAYER.size
+        pixels = zlib.decompress(body[offset:offset + size])
+        offset += size
+        if mode == LAYER_PER_PIXEL_ALPHA:
+            compact = pygame.image.frombytes(pixels, (w, h), "RGBA").convert_alpha()
+        else:
+            compact = pygame.image.frombytes(pixels, (w, h), "RGB").convert()
+            if mode == LAYER_COLORKEY:
+                compact.set_colorkey(BLACK, pygame.RLEACCEL)
+                if alpha < 255:
+                    compact.set_alpha(alpha, pygame.RLEACCEL)
+        layer = ParallaxLayer(None, speed_factor, height)
+        layer.compact = compact
+        layer.compact_offset = (x, y)
+        layers.append(layer)
+    return layers
+
+def load_prepared_layers(seed, cache_dir=CACHE_DIR):
+    """Returns prepared layers and tier variants for `seed`, building and caching them on a miss."""
+    path = os.path.join(cache_dir, f"background_{seed}.bin")
+    try:
+        with open(path, "rb") as f:
+            return decode_prepared_layers(f.read(), seed)
+    except (OSError, ValueError, zlib.error):
+        pass # Missing or stale: rebuild below
+    layers = [ParallaxLayer(surface, factor) for surface, factor
+              in zip(draw_background_surfaces(seed), BACKGROUND_SPEED_FACTORS)]
+    for layer in layers:
+        layer.prepare()
+    layers += build_quality_layers(layers, seed)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_file_atomically(path, encode_prepared_layers(seed, layers))
+    except OSError as e:
+        print(f"Warning: could not cache backgrounds in {cache_dir}: {e}")
+    return layers
+
+def init_backgrounds(seed=BACKGROUND_SEED):
+    """Builds the parallax layers (back to front, clouds separate for foreground)."""
+    global parallax_layers, _quality_layers
+    if RENDERER_MODE == "fast":
+        # The opaque sky/far-mountain layer covers the whole screen, so it doubles as the
+        # clear; the sparse layers become trimmed colorkey surfaces
+        layers = load_prepared_layers(seed)
+    else:
+        layers = [ParallaxLayer(surface, factor) for surface, factor
+                  in zip(draw_background_surfaces(seed), BACKGROUND_SPEED_FACTORS)]
+        if RENDERER_MODE != "gpu":
+            layers += build_quality_layers(layers, seed)
+    parallax_layers = layers
+    # Built with the rest of the backgrounds, so a step down mid-game is instant
+    _quality_layers = dict(zip(QUALITY_LAYER_NAMES, layers[4:])) if len(layers) > 4 else None
+    set_quality_tier(quality_tier)
+
+# --- Render Quality Tiers ---
+# Each tier sheds more of the per-frame drawing cost. "flat_clouds" draws the clouds
+# without alpha blending and freezes the game-over frame instead of redrawing it.
+# "merged_background" also merges the mountains and hills into one opaque layer (they
+# scroll together) and thins the snow dots. "minimal" drops the clouds and snow dots,
+# leaving one opaque blit behind the sprites.
+QUALITY_TIERS = ('full', 'flat_clouds', 'merged_background', 'minimal')
+SPARSE_SNOW_DOTS = 50
+QUALITY_LAYER_NAMES = ('flat_clouds', 'merged', 'sparse_snow') # Order of QUALITY_LAYER_SOURCES
+quality_tier = 0
+_quality_layers = None # Cheaper layer variants (None under the GPU renderer)
+
+def _synced_layer(image, source):
+    """A prepared layer of `image` scrolling exactly like `source`."""
+    layer = ParallaxLayer(image, source.speed_factor, source.height)
+    layer.prepare()
+    layer.y1, layer.y2, layer.last_move = source.y1, source.y2, source.last_move
+    return layer
+
+def _layer_image(layer):
+    """The layer's full-size image, rebuilt from its compact form for cached layers."""
+    if layer.image is not None:
+        return layer.image
+    image = pygame.Surface((SCREEN_WIDTH, layer.height), pygame.SRCALPHA)
+    image.blit(layer.compact, layer.compact_offset)
+    return image
+
+def build_quality_layers(layers, seed):
+    """Builds the lower tiers' layers from the four drawn from `seed`. Requires a display mode."""
+    far, hills, snow, clouds = layers[:4]
+    # Solid cloud shapes: prepare() makes them a colorkey surface, blitted without blending
+    flat_clouds = pygame.mask.from_surface(_layer_image(clouds), 0).to_surface(
+        setcolor=FLAT_CLOUD_COLOR, unsetcolor=(0, 0, 0, 0))
+    merged = pygame.Surface((SCREEN_WIDTH, far.height))
+    merged.blit(_layer_image(far), (0, 0))
+    merged.blit(_layer_image(hills), (0, 0))
+    sparse_snow = draw_background_surfaces(seed, SPARSE_SNOW_DOTS)[2]
+    return [_synced_layer(flat_clouds, clouds), _synced_layer(merged, far), _synced_layer(sparse_snow, snow)]
+
+def set_quality_tier(tier):
+    """Switches the drawn layers to quality tier `tier` (an index into QUALITY_TIERS)."""
+    global quality_tier, background_parallax_layers, foreground_parallax_layers
+    quality_tier = tier
+    if not parallax_layers:
+        return # Applied by init_backgrounds()
+    far, hills, snow, clouds = parallax_layers[:4]
+    if _quality_layers is None:
+        tier = 0 # No variants to switch to
+    if tier >= 3:
+        background_parallax_layers = [_quality_layers['merged']]
+    elif tier == 2:
+        background_parallax_layers = [_quality_layers['merged'], _quality_layers['sparse_snow']]
+    else:
+        background_parallax_layers = [far, hills, snow]
+    if tier >= 3:
+        foreground_parallax_layers = []
+    else:
+        foreground_parallax_layers = [_quality_layers['flat_clouds'] if tier else clouds]
+
+class QualityGovernor:
+    """Steps the render quality tier down when frames run over budget, and back up.
+
+    observe() takes each frame's work time (everything but the pacer's wait). Every
+    WINDOW_FRAMES frames it compares the window's p90 with the frame budget: over
+    DOWN_RATIO of it drops a tier at once; under UP_RATIO for UP_WINDOWS windows in a
+    row raises one. Raising a tier that then has to drop again within FLAP_FRAMES
+    doubles the calm windows needed before the next raise, so it can't flap.
+    """
+    WINDOW_FRAMES = 30
+    DOWN_RATIO = 0.9
+    UP_RATIO = 0.5
+    UP_WINDOWS = 4
+    FLAP_FRAMES = 600
+    MAX_UP_WINDOWS = 64
+
+    def __init__(self, fps, tier=0, history=16):
+        self.budget_ms = 1000.0 / (fps or TICK_RATE)
+        self.tier = tier
+        self.window = []
+        self.calm_windows = 0
+        self.up_windows = self.UP_WINDOWS
+        self.frames = 0
+        self.last_raise = None # Frame of the last step up
+        self.history = deque(maxlen=history) # (frame, from tier, to tier, window p90 ms)
+        self._overlay = None
+
+    @property
+    def tier_name(self):
+        return QUALITY_TIERS[self.tier]
+
+    def observe(self, work_ms):
+        """Records one frame. Returns the new tier when it changes, else None."""
+        self.frames += 1
+        self.window.append(work_ms)
+        if len(self.window) < self.WINDOW_FRAMES:
+            return None
+        self.window.sort()
+        p90 = self.window[int(0.9 * len(self.window))]
+        self.window = []
+        if p90 > self.DOWN_RATIO * self.budget_ms:
+            self.calm_windows = 0
+            if self.tier == len(QUALITY_TIERS) - 1:
+                return None
+            if self.last_raise is not None and self.frames - self.last_raise < self.FLAP_FRAMES:
+                self.up_windows = min(self.MAX_UP_WINDOWS, self.up_windows * 2)
+                self.last_raise = None # One backoff per failed raise
+            return self._switch(self.tier + 1, p90)
+        if p90 < self.UP_RATIO * self.budget_ms and self.tier > 0:
+            self.calm_windows += 1
+            if self.calm_windows >= self.up_windows:
+                self.calm_windows = 0
+                self.last_raise = self.frames
+                return self._switch(self.tier - 1, p90)
+        else:
+            self.calm_windows = 0
+        return None
+
+    def _switch(self, tier, p90):
+        self.history.append((self.frames, self.tier, tier, p90))
+        self.tier = tier
+        self._overlay = None
+        return tier
+
+    def draw_overlay(self, surface):
+        """Draws the tier and the recent switches in the bottom-left corner."""
+        if self._overlay is None:
+            font = get_font('profiler')
+            line_height = font.get_linesize()
+            lines = [f"quality {self.tier} {self.tier_name}  budget {self.budget_ms:.1f} ms"]
+            lines += [f"frame {frame}: {old} -> {new} (p90 {p90:.1f} ms)"
+                      for frame, old, new, p90 in list(self.history)[-4:]]
+            width = max(font.size(line)[0] for line in lines) + 10
+            self._overlay = pygame.Surface((width, line_height * len(lines) + 8))
+            self._overlay.set_alpha(190)
+            for i, line in enumerate(lines):
+                self._overlay.blit(font.render(line, True, WHITE), (5, 4 + i * line_height))
+        surface.blit(self._overlay, (5, surface.get_height() - self._overlay.get_height() - 5))
+
+# --- Retained UI ---
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (font, text, color)."""
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        image = self.entries.get(key)
+        if image is not None:
+            self.entries.move_to_end(key)
+            return image
+        image = font.render(text, True, color)
+        self.entries[key] = image
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False) # Evict the least recently used
+        return image
+
+text_cache = TextCache()
+
+class ComposedScreen:
+    """A surface built by `compose(*inputs)` and rebuilt only when the inputs change."""
+    def __init__(self, compose):
+        self.compose = compose
+        self.inputs = None
+        self.image = None
+
+    def get(self, *inputs):
+        if self.image is None or inputs != self.inputs:
+            self.inputs = inputs
+            self.image = self.compose(*inputs)
+        return self.image
+
+def compose_start_screen(scores, last):
+    surface = display_format(pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)))
     surface.fill(SKY_BLUE)
-    title_text = title_font.render("Horace Skis Again!", True, BLACK)
+    render = text_cache.render
+    title_text = render(get_font('title'), "Horace Skis Again!", BLACK)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.2))
     surface.blit(title_text, title_rect)
-    instr1 = info_font.render("Use Left/Right Arrows to Steer", True, DARK_BLUE)
-    instr2 = info_font.render("Ski Between Flags (Green/Red) for Points", True, DARK_BLUE)
-    instr3 = info_font.render("Avoid the Trees!", True, DARK_RED)
-    instr4 = info_font.render("Press ENTER to Start", True, BLACK)
+    instr1 = render(get_font('info'), "Use Left/Right Arrows to Steer", DARK_BLUE)
+    instr2 = render(get_font('info'), "Ski Between Flags (Green/Red) for Points", DARK_BLUE)
+    instr3 = render(get_font('info'), "Avoid the Trees!", DARK_RED)
+    instr4 = render(get_font('info'), "Press ENTER to Start", BLACK)
     surface.blit(instr1, instr1.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.4)))
     surface.blit(instr2, instr2.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.45)))
     surface.blit(instr3, instr3.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.5)))
     surface.blit(instr4, instr4.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.85)))
-    hs_title = score_font.render("High Scores:", True, BLACK)
+    hs_title = render(get_font('score'), "High Scores:", BLACK)
     surface.blit(hs_title, hs_title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.6)))
     y_offset = SCREEN_HEIGHT * 0.65
-    for i, sc in enumerate(scores[:NUM_HIGH_SCORES_DISPLAY]):
-        hs_text = info_font.render(f"{i+1}. {sc}", True, BLACK)
+    for i, sc in enumerate(scores):
+        hs_text = render(get_font('info'), f"{i+1}. {sc}", BLACK)
         surface.blit(hs_text, hs_text.get_rect(center=(SCREEN_WIDTH // 2, y_offset + i * 30)))
     if last is not None:
-        last_text = info_font.render(f"Last Score: {last}", True, BLACK)
+        last_text = render(get_font('info'), f"Last Score: {last}", BLACK)
         surface.blit(last_text, last_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 0.78)))
+    return surface
+
+def compose_game_over_overlay(current_score):
+    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 150))
+    game_over_text = text_cache.render(get_font('game_over'), "GAME OVER", DARK_RED)
+    score_text = text_cache.render(get_font('score'), f"Final Score: {current_score}", WHITE)
+    restart_text = text_cache.render(get_font('restart'), "Press 'R' to Restart", WHITE)
+    overlay.blit(game_over_text, game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60)))
+    overlay.blit(score_text, score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+    overlay.blit(restart_text, restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60)))
+    return display_format(overlay, alpha=True)
+
+def compose_score_panel(score):
+    score_text = text_cache.render(get_font('score'), f"Score: {score}", BLACK)
+    # A small background rect for score visibility
+    panel = pygame.Surface((score_text.get_width() + 10, score_text.get_height() + 6), pygame.SRCALPHA)
+    panel_rect = panel.get_rect()
+    pygame.draw.rect(panel, WHITE, panel_rect, border_radius=5)
+    pygame.draw.rect(panel, BLACK, panel_rect, width=1, border_radius=5) # Outline
+    panel.blit(score_text, (5, 3)) # Position text inside bg rect
+    return display_format(panel, alpha=True)
+
+start_screen = ComposedScreen(compose_start_screen)
+game_over_overlay = ComposedScreen(compose_game_over_overlay)
+score_panel = ComposedScreen(compose_score_panel)
+
+# --- Scene Drawing ---
+def draw_sprites(surface, group, dy=0):
+    """Draws a sprite group shifted `dy` pixels vertically, in a single blits() call."""
+    surface.blits([(sprite.image, (sprite.rect.x, sprite.rect.y + dy)) for sprite in group], False)
+
+def update_backgrounds(scroll_speed):
+    """Scrolls every parallax layer (including the clouds) by one simulation tick."""
+    for layer in parallax_layers:
+        layer.update(scroll_speed) # Clouds scroll based on game speed too
+
+def draw_scene(surface, sim, alpha=1.0, prof=None):
+    """Draws the slope: backgrounds, trees and flags, the player, then the clouds.
+
+    `alpha` interpolates between the last two simulation ticks (see main()).
+    """
+    # 1. Background Parallax Layers (Back to Front)
+    for layer in background_parallax_layers:
+        layer.draw(surface, alpha)
+    if prof: prof.lap('draw_bg')
+
+    # 2. Game Sprites (Obstacles, Flags), pulled back by the part of the last
+    # tick's scroll this frame hasn't reached yet
+    scroll_dy = round((alpha - 1.0) * sim.scroll_step)
+    if sim.tree_store is not None:
+        sim.tree_store.draw(surface, scroll_dy)
+    draw_sprites(surface, sim.obstacles, scroll_dy)
+    draw_sprites(surface, sim.flags, scroll_dy)
+    if prof: prof.lap('draw_sprites')
+
+    # 3. Player
+    sim.player.draw(surface, alpha)
+    if prof: prof.lap('draw_player')
 
+    # 4. Foreground Parallax Layers (Clouds)
+    for layer in foreground_parallax_layers:
+        layer.draw(surface, alpha)
+    if prof: prof.lap('draw_fg')
+
+# --- Function to Draw Start Screen ---
+def draw_start_screen(surface, scores, last):
+    surface.blit(start_screen.get(tuple(scores[:NUM_HIGH_SCORES_DISPLAY]), last), (0, 0))
 
 # --- Function to Draw Game Over Screen ---
 def draw_game_over_screen(surface, current_score):
-    # (Drawing code remains the same)
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 150))
-    surface.blit(overlay, (0, 0))
-    game_over_text = game_over_font.render("GAME OVER", True, DARK_RED)
-    score_text = score_font.render(f"Final Score: {current_score}", True, WHITE)
-    restart_text = restart_font.render("Press 'R' to Restart", True, WHITE)
-    game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60))
-    score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-    restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
-    surface.blit(game_over_text, game_over_rect)
-    surface.blit(score_text, score_rect)
-    surface.blit(restart_text, restart_rect)
+    surface.blit(game_over_overlay.get(current_score), (0, 0))
+
+# --- Function to Draw Score UI ---
+def draw_score(surface, score):
+    surface.blit(score_panel.get(score), (5, 5))
 
 
 # --- Main Game Loop ---
-running = True
-while running:
-    # --- Event Handling ---
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.KEYDOWN:
-            if game_state == STATE_START_SCREEN:
-                if event.key == pygame.K_RETURN:
-                    reset_game()
-                    game_state = STATE_PLAYING
-            elif game_state == STATE_PLAYING:
-                pass # Player handles keys in update
-            elif game_state == STATE_GAME_OVER:
-                if event.key == pygame.K_r:
-                    # Reset last_score when going back to start screen *after* a game over
-                    # last_score = 0 # Or keep it to show on start screen? Keep it.
-                    game_state = STATE_START_SCREEN
-
-
-    # --- Game Logic ---
-    if game_state == STATE_PLAYING:
-        # Spawn obstacles
-        # (Spawning logic remains the same)
-        now = pygame.time.get_ticks()
-        if now - last_obstacle_spawn_time > obstacle_spawn_delay:
-            last_obstacle_spawn_time = now
-            spawn_type = random.random()
-            if spawn_type < 0.45: # Tree
-                tree_x = random.randint(0, SCREEN_WIDTH - OBSTACLE_WIDTH)
-                tree = Obstacle(tree_x, -OBSTACLE_HEIGHT, current_scroll_speed)
-                obstacles.add(tree)
-                all_game_sprites.add(tree)
-            elif spawn_type < 0.9: # Flag pair
-                min_actual_gap = PLAYER_WIDTH + 2 * GATE_PADDING
-                max_actual_gap = 350
-                actual_gap = random.randint(min_actual_gap, max_actual_gap)
-                min_center = FLAG_IMAGE_WIDTH + actual_gap // 2
-                max_center = SCREEN_WIDTH - FLAG_IMAGE_WIDTH - actual_gap // 2
-                if min_center < max_center:
-                    gap_center_x = random.randint(min_center, max_center)
-                    left_flag_inner_x = gap_center_x - actual_gap // 2
-                    right_flag_inner_x = gap_center_x + actual_gap // 2
-                    left_flag = Flag(left_flag_inner_x, -FLAG_HEIGHT, GREEN, current_scroll_speed, is_left=True)
-                    right_flag = Flag(right_flag_inner_x, -FLAG_HEIGHT, DARK_RED, current_scroll_speed, is_left=False)
-                    flags.add(left_flag, right_flag)
-                    all_game_sprites.add(left_flag, right_flag)
-
-        # Update Player
-        player.update()
-
-        # Update Obstacles and Flags
-        obstacles.update(current_scroll_speed)
-        flags.update(current_scroll_speed)
-
-        # Update Parallax Backgrounds (including clouds)
-        for layer in background_parallax_layers:
-            layer.update(current_scroll_speed)
-        for layer in foreground_parallax_layers:
-            layer.update(current_scroll_speed) # Clouds scroll based on game speed too
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Horace Skis Again!")
+    parser.add_argument("--seed", type=int, help="seed every new game with this value")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded run")
+    parser.add_argument("--rate", type=float, default=1.0, help="replay playback rate (ticks per frame)")
+    parser.add_argument("--verify", metavar="FILE", help="re-simulate a replay headless and check its score")
+    parser.add_argument("--startup-report", action="store_true", help="print how long each startup phase took")
+    parser.add_argument("--forest", type=int, default=0, metavar="N",
+                        help="forest difficulty: N extra trees per spawn slot")
+    args = parser.parse_args(argv)
+    if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+        parser.error("--seed must be between 0 and 2**64 - 1")
+    if not 0 <= args.forest <= MAX_FOREST:
+        parser.error(f"--forest must be between 0 and {MAX_FOREST}")
+    return args
 
-        # --- Collision Detection ---
-        # (Collision logic remains the same)
-        # Trees
-        tree_hits = pygame.sprite.spritecollide(player, obstacles, False, pygame.sprite.collide_rect_ratio(0.8))
-        if tree_hits:
-            print("Hit a tree! Game Over.")
-            last_score = score
-            high_scores = save_high_scores(score, high_scores)
-            game_state = STATE_GAME_OVER
-        # Flags
-        processed_flags = set()
-        for flag in flags:
-            if flag in processed_flags or game_state == STATE_GAME_OVER: continue
-            if not flag.passed and player.rect.centery > flag.rect.top and player.rect.centery < flag.rect.bottom:
-                 pair_flag = None
-                 potential_pairs = [f for f in flags if f != flag and abs(f.rect.y - flag.rect.y) < 5 and f not in processed_flags]
-                 if potential_pairs:
-                     pair_flag = potential_pairs[0]
-                     processed_flags.add(flag); processed_flags.add(pair_flag)
-                     left_f = flag if flag.is_left else pair_flag
-                     right_f = pair_flag if flag.is_left else flag
-                     if player.rect.left > left_f.rect.right and player.rect.right < right_f.rect.left:
-                         score += 10
-                         flag.passed = True; pair_flag.passed = True
-                     else:
-                         print("Missed the gate! Game Over.")
-                         last_score = score
-                         high_scores = save_high_scores(score, high_scores)
-                         game_state = STATE_GAME_OVER
+def verify_main(path):
+    """Headless replay check for the --verify option. Returns a process exit code."""
+    start = time.perf_counter()
+    try:
+        replay, simulated_score = verify_replay(path)
+    except (OSError, ValueError) as e:
+        print(f"Error verifying replay: {e}")
+        return 2
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    ok = simulated_score == replay.score
+    print(f"{path}: seed {replay.seed}, {replay.ticks} ticks, recorded score {replay.score}, "
+          f"simulated score {simulated_score} -> {'OK' if ok else 'MISMATCH'} ({elapsed_ms:.1f} ms)")
+    return 0 if ok else 1
 
-        # --- Speed Increase ---
-        # (Speed logic remains the same)
-        if score >= next_speed_increase_threshold:
-            current_scroll_speed *= (1.0 + SPEED_INCREASE_PERCENT)
-            next_speed_increase_threshold += 100
-            print(f"Score {score}: Speed increased to {current_scroll_speed:.2f}")
+def save_run_replay(sim, high_scores, score_store):
+    """Queues the finished run as the last-run replay on the score store's writer thread,
+    plus a kept copy if it made the table."""
+    data = encode_replay(Replay.from_simulation(sim))
+    score_store.write(os.path.join(REPLAY_DIR, "last_run.skr"), data)
+    if sim.score > 0 and sim.score in high_scores:
+        score_store.write(os.path.join(REPLAY_DIR, f"score_{sim.score}_{sim.seed}.skr"), data)
+
+def log_sim_event(sim, name, value):
+    """Records one of SkiSimulation.step()'s events as telemetry."""
+    if name == 'spawn':
+        if value[0] == 'tree':
+            log_event('spawn_tree', sim.ticks, value[1])
+        else:
+            log_event('spawn_gate', sim.ticks, value[1], value[2])
+    elif name == 'speed_up':
+        log_event('speed_up', sim.ticks, sim.score, value)
+    else: # tree_hit, gate_passed and gate_missed carry the score
+        log_event(name, sim.ticks, sim.score)
+
+def main(argv=None):
+    global telemetry
+    startup = StartupTimer(IMPORT_START)
+    startup.mark('import')
+    args = parse_args(argv)
+    if args.verify:
+        sys.exit(verify_main(args.verify))
+    replay = None
+    if args.replay:
+        try:
+            replay = load_replay(args.replay)
+        except (OSError, ValueError) as e:
+            print(f"Error loading replay: {e}")
+            sys.exit(2)
 
+    if TELEMETRY_FORMAT != "off":
+        telemetry = Telemetry(TELEMETRY_DIR, TELEMETRY_FORMAT)
+    init_display()
+    startup.mark('display')
+    # The live game steps the simulation at TICK_RATE from real elapsed time, reading the
+    # keyboard; frames drawn between ticks interpolate, whatever the display refresh rate.
+    sim = SkiSimulation(input_source=keyboard_input, seed=args.seed, background_course=True,
+                        forest=replay.forest if replay is not None else args.forest)
+    game_state = STATE_START_SCREEN
+    last_score = None # Initialize last_score
+    score_store = ScoreStore()
+    high_scores = score_store.scores()
+    prof = FrameProfiler(output_path=PROFILE_OUTPUT) if PROFILE_ENABLED else None
+    sim.profiler = prof
+    startup.mark('scores')
+    accumulator = 0.0 # Real milliseconds not yet simulated (scaled by --rate in replays)
+    alpha = 1.0 # How far the drawn frame sits between the previous tick and the current one
+    if replay is not None:
+        sim.input_source = replay.input_log.playback()
+        sim.reset(replay.seed, replay.forest)
+        init_backgrounds() # Drawn from the first frame
+        startup.mark('backgrounds')
+        game_state = STATE_PLAYING
+
+    latency = InputLatencyMeter()
+    # The frame budget follows the render cap (uncapped frames still wait for ticks)
+    frame_spike_ms = FRAME_SPIKE_BUDGETS * 1000.0 / (TARGET_FPS or TICK_RATE)
+    governor = None
+    if RENDERER_MODE == "gpu":
+        pass # Layers are textures there, so the quality tiers don't apply
+    elif QUALITY_MODE == "auto":
+        governor = QualityGovernor(TARGET_FPS)
+    elif QUALITY_MODE.isdigit() and int(QUALITY_MODE) < len(QUALITY_TIERS):
+        set_quality_tier(int(QUALITY_MODE))
+    else:
+        print(f"Unknown SKI_QUALITY {QUALITY_MODE!r} (expected auto or 0-{len(QUALITY_TIERS) - 1})")
+        sys.exit(2)
+    game_over_frame = None # The finished game-over screen, reused at quality tiers 1+
+    frames = 0
+    last_frame_time = time.perf_counter()
+    running = True
+    while running:
+        frames += 1
+        frame_start = time.perf_counter()
+        if prof: prof.begin_frame()
+        # --- Event Handling ---
+        # The pacer ends the previous frame right on its deadline, so this pump (which
+        # keyboard_input reads) happens as late as possible before the simulation steps
+        events = pygame.event.get()
+        pumped = time.perf_counter()
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            if (event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key in (pygame.K_LEFT, pygame.K_RIGHT)
+                    and game_state == STATE_PLAYING and replay is None):
+                latency.key_changed(pumped, sim.ticks)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3: # Toggle the frame profiler
+                    if prof:
+                        prof.close()
+                        prof = None
+                    else:
+                        prof = FrameProfiler(output_path=PROFILE_OUTPUT)
+                        prof.begin_frame()
+                    sim.profiler = prof
+                elif game_state == STATE_START_SCREEN:
+                    if event.key == pygame.K_RETURN:
+                        replay = None # After watching a replay, play for real
+                        sim.input_source = keyboard_input
+                        sim.reset(args.seed, args.forest)
+                        log_event('game_start', 0, sim.seed, sim.forest)
+                        accumulator = 0.0
+                        game_state = STATE_PLAYING
+                elif game_state == STATE_PLAYING:
+                    pass # The simulation reads keys through its input source
+                elif game_state == STATE_GAME_OVER:
+                    if event.key == pygame.K_r:
+                        # Keep last_score to show on the start screen
+                        game_state = STATE_START_SCREEN
+                        game_over_frame = None
+        if prof: prof.lap('events')
+
+
+        # --- Game Logic ---
+        now = time.perf_counter()
+        frame_ms = (now - last_frame_time) * 1000
+        if frame_ms > frame_spike_ms:
+            log_event('frame_spike', sim.ticks, frames, frame_ms)
+        elapsed_ms = min(frame_ms, MAX_FRAME_MS)
+        last_frame_time = now
+        alpha = 1.0
+        if game_state == STATE_PLAYING:
+            accumulator += elapsed_ms * (args.rate if replay is not None else 1.0)
+            while accumulator >= TICK_MS:
+                accumulator -= TICK_MS
+                for name, value in sim.step():
+                    if replay is None: # Replays would count their runs twice
+                        log_sim_event(sim, name, value)
 
-    # --- Drawing ---
-    # Draw based on game state
-    if game_state == STATE_START_SCREEN:
-        draw_start_screen(screen, high_scores, last_score) # Pass last_score
+                update_backgrounds(sim.scroll_speed)
+                if prof: prof.lap('parallax')
+                if replay is not None and sim.ticks >= replay.ticks:
+                    sim.game_over = True # Recording ended (e.g. the player quit mid-run)
+                if sim.game_over:
+                    break
+            alpha = accumulator / TICK_MS
 
-    elif game_state == STATE_PLAYING or game_state == STATE_GAME_OVER:
-        # --- Draw Scene ---
-        # 1. Background Parallax Layers (Back to Front)
-        for layer in background_parallax_layers:
-            layer.draw(screen)
+            if sim.game_over:
+                alpha = 1.0 # Freeze on the final tick
+                last_score = sim.score
+                if replay is None:
+                    log_event('game_end', sim.ticks, sim.score, sim.max_scroll_speed)
+                    high_scores = score_store.submit(ScoreRecord.from_simulation(sim))
+                    save_run_replay(sim, high_scores, score_store)
+                game_state = STATE_GAME_OVER
 
-        # 2. Game Sprites (Obstacles, Flags)
-        obstacles.draw(screen)
-        flags.draw(screen)
 
-        # 3. Player
-        player.draw(screen)
+        # --- Drawing ---
+        # Draw based on game state
+        if game_state == STATE_START_SCREEN:
+            draw_start_screen(screen, high_scores, last_score) # Pass last_score
 
-        # 4. Foreground Parallax Layers (Clouds)
-        for layer in foreground_parallax_layers:
-            layer.draw(screen)
-        # --- End Scene ---
+        elif game_state == STATE_GAME_OVER and game_over_frame is not None:
+            screen.blit(game_over_frame, (0, 0)) # Nothing moves, so skip the layers and overlay
 
-        # Draw Score UI (only when playing)
+        elif game_state == STATE_PLAYING or game_state == STATE_GAME_OVER:
+            draw_scene(screen, sim, alpha, prof)
+
+            # Draw Score UI (only when playing)
+            if game_state == STATE_PLAYING:
+                draw_score(screen, sim.score)
+
+            # Draw Game Over Screen (if applicable, drawn over everything else)
+            if game_state == STATE_GAME_OVER:
+                draw_game_over_screen(screen, last_score)
+                if quality_tier > 0:
+                    game_over_frame = screen.copy()
+        if prof:
+            prof.lap('draw_ui')
+            prof.draw_overlay(screen)
+            latency.draw_overlay(screen)
+            if governor is not None:
+                governor.draw_overlay(screen)
+            prof.lap('overlay')
+
+        # --- Update Display ---
+        # A vsynced flip blocks until the display refreshes, so it isn't counted as work
+        work_end = time.perf_counter()
+        present_display()
         if game_state == STATE_PLAYING:
-            score_text = score_font.render(f"Score: {score}", True, BLACK)
-            # Add a small background rect for score visibility
-            score_bg_rect = pygame.Rect(5, 5, score_text.get_width() + 10, score_text.get_height() + 6)
-            pygame.draw.rect(screen, WHITE, score_bg_rect, border_radius=5)
-            pygame.draw.rect(screen, BLACK, score_bg_rect, width=1, border_radius=5) # Outline
-            screen.blit(score_text, (10, 8)) # Position text inside bg rect
-
-        # Draw Game Over Screen (if applicable, drawn over everything else)
-        if game_state == STATE_GAME_OVER:
-            draw_game_over_screen(screen, last_score)
-
-    # --- Update Display ---
-    pygame.display.flip()
-
-    # --- Frame Rate Control ---
-    clock.tick(60)
-
-# --- Quit Pygame ---
-pygame.quit()
-sys.exit()
+            latency.presented(time.perf_counter(), sim.ticks)
+        if prof: prof.lap('flip')
+        if startup is not None:
+            # The start screen needs no backgrounds: load them once it is showing
+            startup.mark('first_frame')
+            if not background_parallax_layers:
+                init_backgrounds()
+                startup.mark('backgrounds')
+            if args.startup_report:
+                print(startup.report())
+            startup = None
+
+        # --- Quality Control ---
+        # Frame time without the pacer's wait: how much of the budget drawing really uses
+        if governor is not None and game_state == STATE_PLAYING:
+            tier = governor.observe(((work_end if VSYNC else time.perf_counter()) - frame_start) * 1000.0)
+            if tier is not None:
+                log_event('quality_change', sim.ticks, tier, governor.history[-1][3])
+                set_quality_tier(tier)
+
+        # --- Frame Rate Control ---
+        pacer.wait()
+        if prof:
+            prof.lap('idle')
+            prof.end_frame(game_state)
+
+    # --- Quit Pygame ---
+    sim.close()
+    score_store.close()
+    if prof: prof.close()
+    if telemetry is not None:
+        telemetry.close(frames)
+        telemetry = None
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Benchmark harness for Horace Skis Again!: scripted scenarios on the real game code.
+
+Each scenario drives SkiSimulation (and so the real Player, Obstacle, Flag and Gate
+classes), the parallax layers and the game's draw path (draw_scene(), the UI and
+present_display()) under SDL's dummy video driver, unthrottled and with fixed seeds. Every
+scenario runs in a fresh process so its peak RSS is its own.
+
+Per scenario it reports update and draw milliseconds per frame (mean and p95), the
+memory allocated per frame (tracemalloc, measured in a separate pass because tracing
+slows everything down), the growth in live allocated blocks over the run (leaks) and
+peak RSS.
+
+    python ski_bench.py                                 # all scenarios, print a table
+    python ski_bench.py --save-baseline bench.json      # record a baseline
+    python ski_bench.py --baseline bench.json           # exit 1 if a metric regressed
+"""
+import argparse
+import array
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None # Not available on Windows: peak RSS is reported as None
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+
+import ski
+
+BASELINE_VERSION = 1
+DEFAULT_THRESHOLD = 0.25 # Allowed relative slowdown before a metric counts as regressed
+WARMUP_FRAMES = 60
+ALLOC_FRAMES = 120 # Frames traced by tracemalloc after the timed frames
+# Absolute slack added to each threshold so tiny, noisy values can't fail a run
+NOISE_FLOOR = {
+    'update_ms_mean': 0.02, 'update_ms_p95': 0.05,
+    'draw_ms_mean': 0.05, 'draw_ms_p95': 0.1,
+    'alloc_kb_per_frame': 2.0, 'block_growth': 500, 'peak_rss_mb': 5.0,
+}
+
+# --- Scenarios ---
+class Scenario:
+    """One scripted workload: update() advances a tick, draw() renders a frame."""
+    frames = 600
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def update(self):
+        pass
+
+    def draw(self):
+        pass
+
+class StartScreenIdle(Scenario):
+    """The start screen with a populated high-score table and nothing pressed."""
+    frames = 600
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.scores = [500, 320, 140]
+
+    def draw(self):
+        ski.draw_start_screen(ski.screen, self.scores, 90)
+        ski.present_display()
+
+class NormalPlay(Scenario):
+    """A bot skiing from the first gate on, restarting the same course when it crashes."""
+    frames = 1800
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.sim = ski.SkiSimulation(input_source=self.steer, seed=seed)
+
+    def steer(self):
+        """Heads for the middle of the lowest gate still ahead."""
+        x = self.sim.player.rect.centerx
+        for gate in self.sim.gates:
+            if not gate.passed and not gate.missed:
+                target = (gate.left_flag.rect.right + gate.right_flag.rect.left) // 2
+                return x > target + 4, x < target - 4
+        return False, False
+
+    def update(self):
+        sim = self.sim
+        sim.step()
+        ski.update_backgrounds(sim.scroll_speed)
+        if sim.game_over:
+            self.game_over()
+
+    def game_over(self):
+        self.sim.reset(self.seed)
+
+    def draw(self):
+        ski.draw_scene(ski.screen, self.sim)
+        ski.draw_score(ski.screen, self.sim.score)
+        ski.present_display()
+
+class MaxSpeed(NormalPlay):
+    """Play after 15 speed increases; crashes are ignored so the slope keeps coming."""
+    SPEED_INCREASES = 15
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        sim = self.sim
+        sim.score = 100 * self.SPEED_INCREASES
+        sim.next_speed_increase_threshold = sim.score + 100
+        sim.scroll_speed = ski.INITIAL_SCROLL_SPEED * (1.0 + ski.SPEED_INCREASE_PERCENT) ** self.SPEED_INCREASES
+
+    def game_over(self):
+        self.sim.game_over = False
+
+class DenseScreen(MaxSpeed):
+    """Hundreds of trees and gates on screen at once, topped up as they scroll away."""
+    SPEED_INCREASES = 0
+    frames = 900
+    TREES = 300
+    GATES = 100
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.rng = random.Random(seed)
+        sim = self.sim
+        span = ski.SCREEN_HEIGHT + ski.OBSTACLE_HEIGHT
+        for y_offset in sorted((self.rng.randrange(span) for _ in range(self.GATES)), reverse=True):
+            sim.place(self.random_gate(), y_offset) # Bottom to top
+        for _ in range(self.TREES):
+            sim.place(self.random_tree(), self.rng.randrange(span))
+
+    def random_tree(self):
+        return ('tree', self.rng.randint(0, ski.SCREEN_WIDTH - ski.OBSTACLE_WIDTH), self.rng.choice(ski.TREE_TYPES))
+
+    def random_gate(self):
+        half_gap = self.rng.randint(ski.MIN_GATE_GAP, ski.MAX_GATE_GAP) // 2
+        center = self.rng.randint(ski.FLAG_IMAGE_WIDTH + half_gap, ski.SCREEN_WIDTH - ski.FLAG_IMAGE_WIDTH - half_gap)
+        return ('gate', center - half_gap, center + half_gap)
+
+    def update(self):
+        super().update()
+        sim = self.sim
+        step = max(1, round(sim.scroll_speed))
+        # Replacements enter just above the spawn row, spread over one tick's scroll
+        for _ in range(self.GATES - len(sim.flags) // 2):
+            sim.place(self.random_gate(), -self.rng.randrange(step))
+        for _ in range(self.TREES - len(sim.obstacles)):
+            sim.place(self.random_tree(), -self.rng.randrange(step))
+
+class Forest(NormalPlay):
+    """Forest mode with a couple of thousand trees on screen; crashes are ignored."""
+    frames = 900
+    FOREST = 600
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.sim.reset(seed, self.FOREST)
+
+    def game_over(self):
+        self.sim.game_over = False
+
+class LongSession(NormalPlay):
+    """Normal play for 10 minutes of game time, to expose leaks and slow drifts."""
+    frames = 36000
+
+SCENARIOS = {
+    'start_screen': StartScreenIdle,
+    'normal_play': NormalPlay,
+    'max_speed': MaxSpeed,
+    'dense_screen': DenseScreen,
+    'forest': Forest,
+    'long_session': LongSession,
+}
+
+# --- Measurement ---
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # Bytes on macOS, KiB elsewhere
+
+def run_scenario(name, frames, seed):
+    """Runs one scenario in this process and returns its metrics."""
+    ski.init_display()
+    ski.init_backgrounds()
+    scenario = SCENARIOS[name](seed)
+    for _ in range(WARMUP_FRAMES):
+        scenario.update()
+        scenario.draw()
+
+    # Preallocated raw doubles, so recording samples doesn't itself allocate
+    update_ms = array.array('d', bytes(8 * frames))
+    draw_ms = array.array('d', bytes(8 * frames))
+    gc.collect() # Count live blocks only, not garbage awaiting collection
+    blocks_start = sys.getallocatedblocks()
+    clock = time.perf_counter
+    for i in range(frames):
+        start = clock()
+        scenario.update()
+        updated = clock()
+        scenario.draw()
+        drawn = clock()
+        update_ms[i] = (updated - start) * 1000.0
+        draw_ms[i] = (drawn - updated) * 1000.0
+    gc.collect()
+    block_growth = sys.getallocatedblocks() - blocks_start
+
+    # Allocation pass: the most memory each frame had allocated on top of what it started with
+    alloc_kb = []
+    tracemalloc.start()
+    for _ in range(ALLOC_FRAMES):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        scenario.update()
+        scenario.draw()
+        alloc_kb.append((tracemalloc.get_traced_memory()[1] - before) / 1024.0)
+    tracemalloc.stop()
+
+    pygame.quit()
+    return {
+        'frames': frames,
+        'update_ms_mean': sum(update_ms) / frames,
+        'update_ms_p95': _percentile(update_ms, 0.95),
+        'draw_ms_mean': sum(draw_ms) / frames,
+        'draw_ms_p95': _percentile(draw_ms, 0.95),
+        'alloc_kb_per_frame': sum(alloc_kb) / len(alloc_kb),
+        'block_growth': block_growth,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def run_isolated(name, frames, seed):
+    """Runs a scenario in a fresh process so RSS and caches don't leak between scenarios."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_scenario, (name, frames, seed))
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'sdl': ".".join(map(str, pygame.get_sdl_version())),
+        'platform': platform.platform(),
+        'renderer': ski.RENDERER_MODE,
+    }
+
+# --- Baselines ---
+def compare(results, baseline, threshold):
+    """Returns (scenario, metric, baseline value, value) for every regressed metric."""
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline['scenarios'].get(name)
+        if reference is None:
+            continue
+        for metric, value in metrics.items():
+            if metric == 'frames' or value is None or reference.get(metric) is None:
+                continue
+            limit = reference[metric] * (1.0 + threshold) + NOISE_FLOOR.get(metric, 0.0)
+            if value > limit:
+                regressions.append((name, metric, reference[metric], value))
+    return regressions
+
+def load_baseline(path):
+    with open(path, "r") as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"{path}: baseline version {baseline.get('version')}, expected {BASELINE_VERSION}")
+    return baseline
+
+def format_table(results):
+    columns = ('update_ms_mean', 'update_ms_p95', 'draw_ms_mean', 'draw_ms_p95',
+               'alloc_kb_per_frame', 'block_growth', 'peak_rss_mb')
+    lines = [f"{'scenario':<14}" + "".join(f"{column:>20}" for column in columns)]
+    for name, metrics in results.items():
+        cells = []
+        for column in columns:
+            value = metrics[column]
+            cells.append(f"{'-':>20}" if value is None else f"{value:>20.3f}" if isinstance(value, float) else f"{value:>20}")
+        lines.append(f"{name:<14}" + "".join(cells))
+    return "\n".join(lines)
+
+# --- Main ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Horace Skis Again! frames")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--frames-scale", type=float, default=1.0,
+                        help="multiply every scenario's frame count (e.g. 0.1 for a quick check)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for courses and scripted layouts")
+    parser.add_argument("--out", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results as a new baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a baseline; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative regression per metric (default %(default)s)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        frames = max(1, round(SCENARIOS[name].frames * args.frames_scale))
+        print(f"Running {name} ({frames} frames)...", flush=True)
+        results[name] = run_isolated(name, frames, args.seed)
+    print(format_table(results))
+
+    report = {'version': BASELINE_VERSION, 'environment': environment(), 'seed': args.seed, 'scenarios': results}
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    if not args.baseline:
+        return 0
+
+    try:
+        baseline = load_baseline(args.baseline)
+    except (OSError, ValueError) as e:
+        print(f"Error loading baseline: {e}")
+        return 2
+    if baseline.get('environment') != report['environment']:
+        print("Warning: baseline was recorded in a different environment; timings may not compare")
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, reference, value in regressions:
+        print(f"REGRESSION {name}.{metric}: {reference:.3f} -> {value:.3f}")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
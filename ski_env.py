@@ -0,0 +1,380 @@
+"""Gym-style environments over the Horace Skis Again! game rules, for bots and training.
+
+SkiEnv wraps one exact, seedable SkiSimulation. VectorSkiEnv steps N independent games
+at once with all state in NumPy arrays, and ProcessVectorSkiEnv shards such a batch
+across worker processes. Actions are 0 (no key), 1 (left), 2 (right) or 3 (both keys,
+right wins as in the game).
+
+The vectorized games follow the same rules as SkiSimulation (spawn cadence and odds, the
+course generator's look-ahead check, pygame's Rect rounding, pixel-exact tree hits per
+player pose, gate checks at the player's row and speed increases) but draw their random
+numbers from NumPy, so a seed does not give the same course as a SkiSimulation with that
+seed.
+"""
+import multiprocessing
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("ski_env needs NumPy: pip install numpy") from None
+
+import ski
+
+# --- Derived Geometry ---
+PLAYER_START_X = ski.SCREEN_WIDTH // 2 - ski.PLAYER_WIDTH // 2
+PLAYER_TOP = ski.SCREEN_HEIGHT - 20 - ski.PLAYER_HEIGHT
+PLAYER_ROW_Y = PLAYER_TOP + ski.PLAYER_HEIGHT // 2 # Player's centery: gates are checked here
+PLAYER_MAX_X = ski.SCREEN_WIDTH - ski.PLAYER_WIDTH
+TREE_SPAWN_Y = -ski.OBSTACLE_HEIGHT
+GATE_SPAWN_Y = -ski.FLAG_HEIGHT
+GATE_INNER_MARGIN = ski.FLAG_IMAGE_WIDTH - ski.FLAG_TRIANGLE_WIDTH # Pole side of each flag
+MAX_TREE_X = ski.SCREEN_WIDTH - ski.OBSTACLE_WIDTH
+
+POSE_STRAIGHT, POSE_LEFT, POSE_RIGHT = 0, 1, 2
+PLACE_NONE, PLACE_TREE, PLACE_GATE = 0, 1, 2
+
+def _build_hit_table():
+    """Precomputes pixel-exact tree hits from the game's own collision masks.
+
+    Returns (table, image_dx, image_y): table[variant, pose, oy + OBSTACLE_HEIGHT - 1,
+    ox + OBSTACLE_WIDTH - 1] is True when a tree whose top-left corner sits at (ox, oy)
+    relative to the player's image overlaps that pose. The player's image is drawn at
+    (player x + image_dx, image_y).
+    """
+    player = ski.Player()
+    cache = ski.get_sprite_cache()
+    poses = (player.mask_straight, player.mask_left, player.mask_right)
+    width = ski.PLAYER_DRAW_WIDTH + ski.OBSTACLE_WIDTH - 1
+    height = ski.PLAYER_DRAW_HEIGHT + ski.OBSTACLE_HEIGHT - 1
+    table = np.zeros((len(ski.TREE_TYPES), len(poses), height, width), dtype=bool)
+    for variant, tree_type in enumerate(ski.TREE_TYPES):
+        tree_mask = cache.tree_mask(tree_type)
+        for pose, pose_mask in enumerate(poses):
+            # convolve() sets bit (i, j) when the tree's bottom-right corner at (i, j) overlaps
+            hits = pose_mask.convolve(tree_mask)
+            for j in range(height):
+                for i in range(width):
+                    table[variant, pose, j, i] = hits.get_at((i, j))
+    return table, player.image_rect.x - player.rect.x, player.image_rect.y
+
+_HIT_TABLE, _PLAYER_IMAGE_DX, _PLAYER_IMAGE_Y = _build_hit_table()
+
+# --- Observations ---
+NUM_OBS_GATES = 2 # Next unpassed gates ahead of the player
+NUM_OBS_TREES = 3 # Nearest trees not yet behind the player
+OBS_SIZE = 2 + 3 * NUM_OBS_GATES + 2 * NUM_OBS_TREES
+
+def _round_half_away(values):
+    """pygame stores Rect coordinates rounded half away from zero."""
+    return np.copysign(np.floor(np.abs(values) + 0.5), values)
+
+def _observe(player_x, speed, gate_y, gate_left, gate_right, gate_pending, tree_x, tree_y, tree_alive):
+    """Builds the (N, OBS_SIZE) float32 observation from per-game state arrays.
+
+    Per game: player x and scroll speed, then for each of the next gates its distance
+    above the player's row and the x range the player's body must fit in, then for each
+    of the nearest trees its distance above the player and x offset. Missing entries
+    read as far away. Everything is scaled by the screen size or initial speed.
+    """
+    n = player_x.shape[0]
+    obs = np.empty((n, OBS_SIZE), dtype=np.float32)
+    obs[:, 0] = player_x / ski.SCREEN_WIDTH
+    obs[:, 1] = speed / ski.INITIAL_SCROLL_SPEED
+    rows = np.arange(n)[:, None]
+
+    ahead = gate_pending & (gate_y < PLAYER_ROW_Y)
+    order = np.argsort(np.where(ahead, -gate_y, np.inf), axis=1, kind='stable')[:, :NUM_OBS_GATES]
+    valid = ahead[rows, order]
+    obs[:, 2:2 + 3 * NUM_OBS_GATES:3] = np.where(valid, (PLAYER_ROW_Y - gate_y[rows, order]) / ski.SCREEN_HEIGHT, 1.0)
+    obs[:, 3:2 + 3 * NUM_OBS_GATES:3] = np.where(valid, (gate_left[rows, order] + GATE_INNER_MARGIN) / ski.SCREEN_WIDTH, 0.0)
+    obs[:, 4:2 + 3 * NUM_OBS_GATES:3] = np.where(valid, (gate_right[rows, order] - GATE_INNER_MARGIN) / ski.SCREEN_WIDTH, 1.0)
+
+    base = 2 + 3 * NUM_OBS_GATES
+    near = tree_alive & (tree_y < PLAYER_TOP + ski.PLAYER_HEIGHT)
+    order = np.argsort(np.where(near, -tree_y, np.inf), axis=1, kind='stable')[:, :NUM_OBS_TREES]
+    valid = near[rows, order]
+    obs[:, base::2] = np.where(valid, (PLAYER_TOP - tree_y[rows, order]) / ski.SCREEN_HEIGHT, 1.0)
+    obs[:, base + 1::2] = np.where(valid, (tree_x[rows, order] - player_x[:, None]) / ski.SCREEN_WIDTH, 1.0)
+    return obs
+
+# --- Single Exact Game ---
+class SkiEnv:
+    """One game on the real SkiSimulation: seeds and replays match the game exactly."""
+    def __init__(self, seed=None):
+        self._action = 0
+        self.sim = ski.SkiSimulation(input_source=self._input, seed=seed)
+
+    def _input(self):
+        return bool(self._action & 1), bool(self._action & 2)
+
+    def reset(self, seed=None):
+        self.sim.reset(seed)
+        return self._observation()
+
+    def step(self, action):
+        """Returns (observation, reward, done, info); the reward is the score gained."""
+        self._action = int(action)
+        score = self.sim.score
+        self.sim.step()
+        info = {'score': self.sim.score, 'ticks': self.sim.ticks, 'reason': self.sim.game_over_reason}
+        return self._observation(), self.sim.score - score, self.sim.game_over, info
+
+    def _observation(self):
+        sim = self.sim
+        gates = list(sim.gates)
+        trees = list(sim.obstacles)
+        gate_slots = max(len(gates), NUM_OBS_GATES) # Pad so every observation slot exists
+        tree_slots = max(len(trees), NUM_OBS_TREES)
+        return _observe(
+            np.array([sim.player.rect.x], dtype=np.float64),
+            np.array([sim.scroll_speed]),
+            _row([g.rect.y for g in gates], gate_slots),
+            _row([g.left_flag.rect.right - GATE_INNER_MARGIN for g in gates], gate_slots),
+            _row([g.right_flag.rect.left + GATE_INNER_MARGIN for g in gates], gate_slots),
+            _row([not g.passed for g in gates], gate_slots, dtype=bool),
+            _row([t.rect.x for t in trees], tree_slots),
+            _row([t.rect.y for t in trees], tree_slots),
+            _row([True] * len(trees), tree_slots, dtype=bool),
+        )[0]
+
+def _row(values, width, dtype=np.float64):
+    """A (1, width) array holding `values`, zero/False padded."""
+    row = np.zeros((1, width), dtype=dtype)
+    row[0, :len(values)] = values
+    return row
+
+# --- Batched Games ---
+class VectorSkiEnv:
+    """N independent games advanced together; finished games reset automatically.
+
+    step() returns (observations, rewards, dones, info) where info holds 'score' and
+    'ticks' of the running games and 'final_score' (-1 unless the game just ended).
+    """
+    REASON_NONE, REASON_TREE, REASON_GATE = 0, 1, 2
+
+    def __init__(self, num_envs, seed=None, max_trees=8, max_gates=8):
+        self.num_envs = num_envs
+        self.max_trees = max_trees # Slots per game; at most ~4 of each are ever on screen
+        self.max_gates = max_gates
+        n = num_envs
+        self.player_x = np.zeros(n, dtype=np.int64)
+        self.speed = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.threshold = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.last_spawn_tick = np.zeros(n, dtype=np.int64)
+        self.tree_x = np.zeros((n, max_trees))
+        self.tree_y = np.zeros((n, max_trees))
+        self.tree_alive = np.zeros((n, max_trees), dtype=bool)
+        self.tree_variant = np.zeros((n, max_trees), dtype=np.int64) # Index into ski.TREE_TYPES
+        self.tree_next = np.zeros(n, dtype=np.int64)
+        self.gate_left = np.zeros((n, max_gates)) # Inner x of the left flag
+        self.gate_right = np.zeros((n, max_gates)) # Inner x of the right flag
+        self.gate_y = np.zeros((n, max_gates))
+        self.gate_alive = np.zeros((n, max_gates), dtype=bool)
+        self.gate_passed = np.zeros((n, max_gates), dtype=bool)
+        self.gate_next = np.zeros(n, dtype=np.int64)
+        # Each game's next rolled placement, held back one spawn for the look-ahead check:
+        # kind, then (x, variant) for a tree or (left inner x, right inner x) for a gate
+        self.next_kind = np.zeros(n, dtype=np.int64)
+        self.next_a = np.zeros(n, dtype=np.int64)
+        self.next_b = np.zeros(n, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_games(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def _reset_games(self, mask):
+        self.player_x[mask] = PLAYER_START_X
+        self.speed[mask] = ski.INITIAL_SCROLL_SPEED
+        self.score[mask] = 0
+        self.threshold[mask] = 100
+        self.ticks[mask] = 0
+        self.last_spawn_tick[mask] = 0
+        self.tree_alive[mask] = False
+        self.tree_next[mask] = 0
+        self.gate_alive[mask] = False
+        self.gate_passed[mask] = False
+        self.gate_next[mask] = 0
+        idx = np.flatnonzero(mask)
+        self.next_kind[idx], self.next_a[idx], self.next_b[idx] = self._roll(idx.size)
+
+    def _roll(self, count):
+        """`count` raw placements with CourseGenerator's odds, as (kind, a, b) arrays."""
+        roll = self.rng.random(count)
+        kind = np.where(roll < 0.45, PLACE_TREE, np.where(roll < 0.9, PLACE_GATE, PLACE_NONE))
+        tree_x = self.rng.integers(0, MAX_TREE_X + 1, count)
+        variant = self.rng.integers(0, len(ski.TREE_TYPES), count)
+        half_gap = self.rng.integers(ski.MIN_GATE_GAP, ski.MAX_GATE_GAP + 1, count) // 2
+        low = ski.FLAG_IMAGE_WIDTH + half_gap
+        high = ski.SCREEN_WIDTH - ski.FLAG_IMAGE_WIDTH - half_gap
+        center = self.rng.integers(low, high + 1)
+        is_tree = kind == PLACE_TREE
+        return kind, np.where(is_tree, tree_x, center - half_gap), np.where(is_tree, variant, center + half_gap)
+
+    def _spawn(self, idx):
+        """Places the held-back placement of the games listed in `idx` and rolls their next."""
+        kind, a, b = self.next_kind[idx], self.next_a[idx], self.next_b[idx]
+        next_kind, next_a, next_b = self._roll(idx.size)
+        self.next_kind[idx], self.next_a[idx], self.next_b[idx] = next_kind, next_a, next_b
+        # A tree just before a gate must clear the gate's opening: re-roll it, else leave it out
+        blocking = (kind == PLACE_TREE) & (next_kind == PLACE_GATE) & (a + ski.OBSTACLE_WIDTH > next_a) & (a < next_b)
+        for _ in range(ski.TREE_REPLACE_TRIES):
+            if not blocking.any():
+                break
+            a[blocking] = self.rng.integers(0, MAX_TREE_X + 1, int(blocking.sum()))
+            blocking &= (a + ski.OBSTACLE_WIDTH > next_a) & (a < next_b)
+        kind[blocking] = PLACE_NONE
+
+        is_tree = kind == PLACE_TREE
+        trees = idx[is_tree]
+        if trees.size:
+            slot = self.tree_next[trees] % self.max_trees
+            self.tree_x[trees, slot] = a[is_tree]
+            self.tree_variant[trees, slot] = b[is_tree]
+            self.tree_y[trees, slot] = TREE_SPAWN_Y
+            self.tree_alive[trees, slot] = True
+            self.tree_next[trees] += 1
+        is_gate = kind == PLACE_GATE
+        gates = idx[is_gate]
+        if gates.size:
+            slot = self.gate_next[gates] % self.max_gates
+            self.gate_left[gates, slot] = a[is_gate]
+            self.gate_right[gates, slot] = b[is_gate]
+            self.gate_y[gates, slot] = GATE_SPAWN_Y
+            self.gate_alive[gates, slot] = True
+            self.gate_passed[gates, slot] = False
+            self.gate_next[gates] += 1
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        self.ticks += 1
+
+        spawning = np.flatnonzero(self.ticks - self.last_spawn_tick >= ski.OBSTACLE_SPAWN_TICKS)
+        if spawning.size:
+            self.last_spawn_tick[spawning] = self.ticks[spawning]
+            self._spawn(spawning)
+
+        # Player, then trees and flags (pygame rounds the moved Rect, then kills below the screen)
+        dx = np.where(actions & 2, ski.PLAYER_SPEED, np.where(actions & 1, -ski.PLAYER_SPEED, 0))
+        np.clip(self.player_x + dx, 0, PLAYER_MAX_X, out=self.player_x)
+        step = self.speed[:, None]
+        self.tree_y = _round_half_away(self.tree_y + step)
+        self.tree_alive &= self.tree_y <= ski.SCREEN_HEIGHT
+        self.gate_y = _round_half_away(self.gate_y + step)
+        self.gate_alive &= self.gate_y <= ski.SCREEN_HEIGHT
+
+        # Trees: look up each tree's offset from the player's image in the pose's hit table
+        pose = np.where(dx < 0, POSE_LEFT, np.where(dx > 0, POSE_RIGHT, POSE_STRAIGHT))
+        ix = self.tree_x.astype(np.int64) - (self.player_x + _PLAYER_IMAGE_DX)[:, None] + ski.OBSTACLE_WIDTH - 1
+        iy = self.tree_y.astype(np.int64) - _PLAYER_IMAGE_Y + ski.OBSTACLE_HEIGHT - 1
+        height, width = _HIT_TABLE.shape[2:]
+        near = self.tree_alive & (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height)
+        hit_tree = (near & _HIT_TABLE[self.tree_variant, pose[:, None],
+                                      np.clip(iy, 0, height - 1), np.clip(ix, 0, width - 1)]).any(axis=1)
+
+        # Gates level with the player's row (skipped once a tree has been hit)
+        at_row = (self.gate_alive & ~self.gate_passed & ~hit_tree[:, None]
+                  & (self.gate_y < PLAYER_ROW_Y) & (self.gate_y + ski.FLAG_HEIGHT > PLAYER_ROW_Y))
+        player_left = self.player_x[:, None]
+        between = ((player_left > self.gate_left + GATE_INNER_MARGIN)
+                   & (player_left + ski.PLAYER_WIDTH < self.gate_right - GATE_INNER_MARGIN))
+        passed = at_row & between
+        missed = (at_row & ~between).any(axis=1)
+        self.gate_passed |= passed
+        rewards = 10 * passed.sum(axis=1)
+        self.score += rewards
+
+        # Speed increase
+        faster = self.score >= self.threshold
+        self.speed[faster] *= 1.0 + ski.SPEED_INCREASE_PERCENT
+        self.threshold[faster] += 100
+
+        dones = hit_tree | missed
+        final_score = np.where(dones, self.score, -1)
+        reason = np.where(hit_tree, self.REASON_TREE, np.where(missed, self.REASON_GATE, self.REASON_NONE))
+        info = {'final_score': final_score, 'reason': reason}
+        if dones.any():
+            self._reset_games(dones)
+        info['score'] = self.score.copy()
+        info['ticks'] = self.ticks.copy()
+        return self.observe(), rewards, dones, info
+
+    def observe(self):
+        return _observe(self.player_x, self.speed, self.gate_y, self.gate_left, self.gate_right,
+                        self.gate_alive & ~self.gate_passed, self.tree_x, self.tree_y, self.tree_alive)
+
+# --- Process Pool Backend ---
+def _worker(conn, num_envs, seed, max_trees, max_gates):
+    env = VectorSkiEnv(num_envs, seed=seed, max_trees=max_trees, max_gates=max_gates)
+    try:
+        while True:
+            command, data = conn.recv()
+            if command == 'step':
+                conn.send(env.step(data))
+            elif command == 'reset':
+                conn.send(env.reset(data))
+            elif command == 'close':
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+class ProcessVectorSkiEnv:
+    """A VectorSkiEnv batch sharded across worker processes (one shard per worker).
+
+    Same interface as VectorSkiEnv. Worth it when each shard is large (thousands of
+    games) so the NumPy work outweighs the cost of piping actions and results.
+    """
+    def __init__(self, num_envs, num_workers=None, seed=None, max_trees=8, max_gates=8):
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        self.num_envs = num_envs
+        self.sizes = [len(part) for part in np.array_split(np.arange(num_envs), num_workers)]
+        self.splits = np.cumsum(self.sizes)[:-1]
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        self.connections = []
+        self.processes = []
+        for size, worker_seed in zip(self.sizes, seeds):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child, size, worker_seed, max_trees, max_gates), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self, seed=None):
+        seeds = np.random.SeedSequence(seed).spawn(len(self.connections)) if seed is not None else [None] * len(self.connections)
+        for conn, worker_seed in zip(self.connections, seeds):
+            conn.send(('reset', worker_seed))
+        return np.concatenate([conn.recv() for conn in self.connections])
+
+    def step(self, actions):
+        for conn, part in zip(self.connections, np.split(np.asarray(actions), self.splits)):
+            conn.send(('step', part))
+        results = [conn.recv() for conn in self.connections]
+        obs, rewards, dones, infos = zip(*results)
+        info = {key: np.concatenate([i[key] for i in infos]) for key in infos[0]}
+        return np.concatenate(obs), np.concatenate(rewards), np.concatenate(dones), info
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self.processes:
+            process.join(timeout=1)
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,336 @@
+"""Course-fairness analyzer for Horace Skis Again!: how often a course can't be cleared.
+
+Courses come from the game's own CourseGenerator. Each one is played out tick by tick
+with the game's rules: spawn timing, scrolling, the pixel masks for tree hits, the gate
+check and the speed-ups every 100 points. Instead of one skier, the analyzer tracks
+every x position the skier could be at. Each tick the positions spread by PLAYER_SPEED
+left and right and lose any that hit a tree in the pose needed to get there. A gate
+keeps only the positions between its flags. The positions are held as bits of one
+Python integer. When none remain, the course is unwinnable at the current score (the
+best score any input could reach). Courses that keep a position to the end of the
+horizon are clearable.
+
+Courses are spread over a process pool and the results are printed as a histogram of
+the score at which courses became unwinnable.
+
+    python ski_fairness.py --courses 20000                    # 20000 courses of 4 segments
+    python ski_fairness.py --courses 200000 --segments 8 --json fairness.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+
+import ski
+
+MAX_X = ski.SCREEN_WIDTH - ski.PLAYER_WIDTH # Rightmost player rect.x
+ALL_POSITIONS = (1 << (MAX_X + 1)) - 1
+LEFT_WALL = (1 << ski.PLAYER_SPEED) - 1 # Positions a left step clamps to 0
+RIGHT_WALL = LEFT_WALL << (MAX_X + 1 - ski.PLAYER_SPEED) # Positions a right step clamps to MAX_X
+# Free ticks after which more spreading adds nothing: enough to reach either wall and
+# spread back across the whole slope
+SATURATION_STEPS = 2 * (MAX_X // ski.PLAYER_SPEED + 2)
+HISTOGRAM_BUCKET = 100 # Points per histogram bar (one speed level)
+CHUNK_COURSES = 64 # Courses per task handed to a worker
+
+class CollisionTables:
+    """Which player positions each tree blocks, built from the game's own sprites.
+
+    For a tree whose top is dy pixels below the top of the player's image,
+    `blocked[tree_type][dy - dy_min]` holds one bit set per pose (left, straight,
+    right) with a bit for every offset at which the pose's mask overlaps the tree's.
+    Shifted by tree_shift() of the tree's x, they give the player rect.x values it blocks.
+    """
+    def __init__(self):
+        player = ski.Player()
+        cache = ski.get_sprite_cache()
+        self.band_x = player.image_rect.x - player.rect.x # Image offset from the rect
+        self.band_y = player.image_rect.y
+        self.start_x = player.rect.x
+        self.player_y = player.rect.centery # Gates are checked as they cross this row
+        self.dy_min = -ski.OBSTACLE_HEIGHT + 1
+        self.dy_max = player.image_rect.height - 1
+        self.shift_base = player.image_rect.width # Keeps every table offset non-negative
+        poses = (player.mask_left, player.mask_straight, player.mask_right)
+        self.blocked = {}
+        for tree_type in ski.TREE_TYPES:
+            tree_mask = cache.tree_mask(tree_type)
+            rows = []
+            for dy in range(self.dy_min, self.dy_max + 1):
+                row = []
+                for player_mask in poses:
+                    bits = 0
+                    for ox in range(-ski.OBSTACLE_WIDTH + 1, player.image_rect.width):
+                        if player_mask.overlap(tree_mask, (ox, dy)):
+                            bits |= 1 << (self.shift_base - ox)
+                    row.append(bits)
+                rows.append(tuple(row))
+            self.blocked[tree_type] = rows
+        # The opening a gate leaves: measured on real flags, relative to the inner x values
+        gate = ski.Gate(100, 300, 0, 0)
+        self.gate_left_clear = gate.left_flag.rect.right - 100
+        self.gate_right_clear = 300 - gate.right_flag.rect.left
+
+    def tree_shift(self, tree_x):
+        """How far left (negative: right) to shift a table row for a tree at `tree_x`."""
+        return tree_x - self.band_x - self.shift_base
+
+    def gate_opening(self, left_inner_x, right_inner_x):
+        """Player rect.x values (as bits) that pass between the flags."""
+        low = left_inner_x + self.gate_left_clear + 1
+        high = right_inner_x - self.gate_right_clear - ski.PLAYER_WIDTH - 1
+        if high < low:
+            return 0
+        return ((1 << (high - low + 1)) - 1) << low & ALL_POSITIONS
+
+_tables = None
+
+def collision_tables():
+    global _tables
+    if _tables is None:
+        _tables = CollisionTables()
+    return _tables
+
+def spread(positions):
+    """Every position one step left, straight on and right reaches, by pose."""
+    left = positions >> ski.PLAYER_SPEED
+    if positions & LEFT_WALL:
+        left |= 1
+    right = (positions << ski.PLAYER_SPEED) & ALL_POSITIONS
+    if positions & RIGHT_WALL:
+        right |= 1 << MAX_X
+    return left, positions, right
+
+def spread_many(positions, steps):
+    """Every position reachable in `steps` ticks with nothing in the way.
+
+    Equal to applying spread() `steps` times and merging the poses, but in a few
+    operations: shifted copies cover every lattice offset up to `steps` strides (the
+    covered range roughly triples each round), and a wall that a position can reach
+    contributes what is reachable from the wall in the steps left over.
+    """
+    steps = min(steps, SATURATION_STEPS)
+    if not positions or steps <= 0:
+        return positions
+    # Offset by `margin` so shifted copies may pass the walls and come back unclipped
+    margin = steps * ski.PLAYER_SPEED
+    reach = positions << margin
+    covered = 0
+    while covered < steps:
+        stride = min(2 * covered + 1, steps - covered)
+        shift = stride * ski.PLAYER_SPEED
+        reach |= (reach << shift) | (reach >> shift)
+        covered += stride
+    reach = (reach >> margin) & ALL_POSITIONS
+    lowest = (positions & -positions).bit_length() - 1
+    if lowest > 0:
+        left_over = steps - -(-lowest // ski.PLAYER_SPEED)
+        if left_over >= 0:
+            reach |= spread_many(1, left_over)
+    highest = positions.bit_length() - 1
+    if highest < MAX_X:
+        left_over = steps - -(-(MAX_X - highest) // ski.PLAYER_SPEED)
+        if left_over >= 0:
+            reach |= spread_many(1 << MAX_X, left_over)
+    return reach
+
+def analyze_course(seed, slots, forest=0):
+    """Plays out `slots` spawn slots of course `seed` for every possible input.
+
+    Returns (best score, tick, cause): cause is 'tree' or 'gate' for the obstacle that
+    removed the last position, or None if the course can be cleared to the horizon.
+    Objects move by the game's integer scroll step (see SkiSimulation.scroll_px), so
+    positions are tracked in world y: screen y = world y + scroll.
+    """
+    tables = collision_tables()
+    generator = ski.CourseGenerator(seed, forest)
+    segment = generator.next_segment()
+    slot_index = 0
+    positions = 1 << tables.start_x
+    speed = ski.INITIAL_SCROLL_SPEED
+    step = ski.round_half_away(speed)
+    threshold = 100
+    score = 0
+    scroll = 0
+    trees = [] # (world y, tree_shift(), blocked rows)
+    gates = [] # [world top, left inner x, right inner x, passed], bottom (oldest) first
+    band_top = tables.band_y + tables.dy_min
+    band_bottom = tables.band_y + tables.dy_max
+    player_y = tables.player_y
+    tick = last_spawn = 0
+    in_band = False # A tree overlapped the player's rows last tick
+    while True:
+        if not in_band:
+            # Nothing but the walls limits movement before the next spawn, a tree reaching
+            # the player's rows or a gate reaching its check row: skip to the tick before
+            wait = last_spawn + ski.OBSTACLE_SPAWN_TICKS - tick
+            for tree in trees:
+                wait = min(wait, -((tree[0] + scroll - band_top) // step))
+            for gate in gates:
+                if not gate[3]:
+                    wait = min(wait, -((gate[0] + scroll + ski.FLAG_HEIGHT - player_y - 1) // step))
+            if wait > 1:
+                positions = spread_many(positions, wait - 1)
+                tick += wait - 1
+                scroll += (wait - 1) * step
+        tick += 1
+        if tick - last_spawn >= ski.OBSTACLE_SPAWN_TICKS:
+            last_spawn = tick
+            if slot_index >= slots:
+                if not trees and not gates:
+                    return score, tick, None
+            else:
+                local = slot_index % ski.COURSE_SEGMENT_SLOTS
+                if local == 0 and slot_index:
+                    segment = generator.next_segment()
+                placement = segment.placements[local]
+                slot_index += 1
+                if placement is not None:
+                    if placement[0] == 'tree':
+                        trees.append((-ski.OBSTACLE_HEIGHT - scroll, tables.tree_shift(placement[1]),
+                                      tables.blocked[placement[2]]))
+                    else:
+                        gates.append([-ski.FLAG_HEIGHT - scroll, placement[1], placement[2], False])
+                if segment.forest is not None:
+                    for tree_x, offset, tree_type in segment.forest[local]:
+                        trees.append((-ski.OBSTACLE_HEIGHT - offset - scroll, tables.tree_shift(tree_x),
+                                      tables.blocked[tree_type]))
+        scroll += step
+
+        # Trees: only those overlapping the player's image rows can block anything
+        blocked_left = blocked_straight = blocked_right = 0
+        gone = in_band = False
+        for tree in trees:
+            y = tree[0] + scroll
+            if y > band_bottom:
+                gone = True
+            elif y >= band_top:
+                in_band = True
+                left_bits, straight_bits, right_bits = tree[2][y - band_top]
+                shift = tree[1]
+                if shift >= 0:
+                    blocked_left |= left_bits << shift
+                    blocked_straight |= straight_bits << shift
+                    blocked_right |= right_bits << shift
+                else:
+                    blocked_left |= left_bits >> -shift
+                    blocked_straight |= straight_bits >> -shift
+                    blocked_right |= right_bits >> -shift
+        if gone:
+            trees = [tree for tree in trees if tree[0] + scroll <= band_bottom]
+        if blocked_left or blocked_straight or blocked_right:
+            left, straight, right = spread(positions)
+            positions = (left & ~blocked_left) | (straight & ~blocked_straight) | (right & ~blocked_right)
+            if not positions:
+                return score, tick, 'tree'
+        else:
+            left, straight, right = spread(positions)
+            positions = left | straight | right
+
+        # Gates, exactly as SkiSimulation.step checks them
+        while gates and gates[0][0] + scroll >= player_y:
+            gates.pop(0)
+        for gate in gates:
+            top = gate[0] + scroll
+            if top + ski.FLAG_HEIGHT <= player_y:
+                break
+            if gate[3]:
+                continue
+            positions &= tables.gate_opening(gate[1], gate[2])
+            if not positions:
+                return score, tick, 'gate'
+            gate[3] = True
+            score += 10
+        if score >= threshold:
+            speed *= 1.0 + ski.SPEED_INCREASE_PERCENT
+            step = ski.round_half_away(speed)
+            threshold += 100
+
+def analyze_chunk(task):
+    """Analyzes courses first_seed .. first_seed + count - 1. Returns tallies for merge()."""
+    first_seed, count, slots, forest = task
+    unwinnable = Counter() # Histogram bucket -> courses
+    causes = Counter()
+    scores = 0
+    cleared = 0
+    for seed in range(first_seed, first_seed + count):
+        score, _, cause = analyze_course(seed, slots, forest)
+        scores += score
+        if cause is None:
+            cleared += 1
+        else:
+            unwinnable[score // HISTOGRAM_BUCKET * HISTOGRAM_BUCKET] += 1
+            causes[cause] += 1
+    return {'courses': count, 'cleared': cleared, 'score_total': scores,
+            'unwinnable': unwinnable, 'causes': causes}
+
+def merge(parts):
+    total = {'courses': 0, 'cleared': 0, 'score_total': 0, 'unwinnable': Counter(), 'causes': Counter()}
+    for part in parts:
+        for key in ('courses', 'cleared', 'score_total'):
+            total[key] += part[key]
+        total['unwinnable'].update(part['unwinnable'])
+        total['causes'].update(part['causes'])
+    return total
+
+def format_histogram(total, width=50):
+    lines = [f"{'score':>11}  {'courses':>9}"]
+    peak = max(total['unwinnable'].values(), default=0) or 1
+    for bucket in sorted(total['unwinnable']):
+        count = total['unwinnable'][bucket]
+        label = f"{bucket}-{bucket + HISTOGRAM_BUCKET - 10}"
+        lines.append(f"{label:>11}  {count:>9}  {'#' * max(1, round(width * count / peak))}")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find how often Horace Skis Again! courses can't be cleared")
+    parser.add_argument("--courses", type=int, default=10000, help="courses to analyze (default %(default)s)")
+    parser.add_argument("--segments", type=int, default=4,
+                        help=f"horizon per course in segments of {ski.COURSE_SEGMENT_SLOTS} spawn slots (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first course; the rest follow on")
+    parser.add_argument("--forest", type=int, default=0, help="forest difficulty to analyze")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: one per CPU)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    if args.courses < 1 or args.segments < 1:
+        parser.error("--courses and --segments must be at least 1")
+    if not 0 <= args.forest <= ski.MAX_FOREST:
+        parser.error(f"--forest must be between 0 and {ski.MAX_FOREST}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    slots = args.segments * ski.COURSE_SEGMENT_SLOTS
+    tasks = [(seed, min(CHUNK_COURSES, args.seed + args.courses - seed), slots, args.forest)
+             for seed in range(args.seed, args.seed + args.courses, CHUNK_COURSES)]
+    start = time.perf_counter()
+    if args.jobs > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(args.jobs) as pool:
+            total = merge(pool.imap_unordered(analyze_chunk, tasks))
+    else:
+        total = merge(map(analyze_chunk, tasks))
+    elapsed = time.perf_counter() - start
+
+    courses = total['courses']
+    unwinnable = courses - total['cleared']
+    print(f"{courses} courses, up to {args.segments} segments each, in {elapsed:.1f} s")
+    print(f"clearable: {total['cleared']} ({total['cleared'] / courses:.2%}), "
+          f"unwinnable: {unwinnable} ({unwinnable / courses:.2%}; "
+          f"{total['causes']['tree']} blocked by trees, {total['causes']['gate']} by an unreachable gate)")
+    print(f"mean best score: {total['score_total'] / courses:.1f}")
+    if unwinnable:
+        print("Best possible score of the unwinnable courses:")
+        print(format_histogram(total))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'courses': courses, 'segments': args.segments, 'seed': args.seed, 'forest': args.forest,
+                       'cleared': total['cleared'], 'causes': dict(total['causes']),
+                       'mean_best_score': total['score_total'] / courses,
+                       'unwinnable_by_score': {str(k): v for k, v in sorted(total['unwinnable'].items())}}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Summarises Horace Skis Again! telemetry: many session files into one report.
+
+The game writes one file per session (see ski.Telemetry) to SKI_TELEMETRY_DIR, in
+binary (.skt) or JSONL form. This tool reads any mix of them, in parallel across
+processes, and reports sessions, games, scores, how runs ended, gate and spawn counts,
+top speeds and frame-time spikes.
+
+    python ski_telemetry.py                         # every file in ./telemetry
+    python ski_telemetry.py fleet/*/ --json out.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from collections import Counter
+
+import ski
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+def summarize_file(path):
+    """Aggregates one session file. Returns a partial summary, or an error string."""
+    try:
+        events = ski.read_telemetry_file(path)
+    except (OSError, ValueError) as e:
+        return str(e)
+    counts = Counter()
+    scores = []
+    game_ms = 0.0
+    max_speed = 0.0
+    spikes = []
+    for _, tick, name, a, b in events:
+        counts[name] += 1
+        if name == 'game_end':
+            scores.append(a)
+            game_ms += tick * ski.TICK_MS
+            max_speed = max(max_speed, b)
+        elif name == 'frame_spike':
+            spikes.append(b)
+    return {'files': 1, 'counts': counts, 'scores': scores, 'game_ms': game_ms,
+            'max_speed': max_speed, 'spikes': spikes}
+
+def merge(summaries):
+    total = {'files': 0, 'counts': Counter(), 'scores': [], 'game_ms': 0.0, 'max_speed': 0.0, 'spikes': []}
+    for part in summaries:
+        total['files'] += part['files']
+        total['counts'].update(part['counts'])
+        total['scores'] += part['scores']
+        total['game_ms'] += part['game_ms']
+        total['max_speed'] = max(total['max_speed'], part['max_speed'])
+        total['spikes'] += part['spikes']
+    return total
+
+def report(total):
+    """The merged summary as plain JSON-ready numbers."""
+    counts = total['counts']
+    scores = total['scores']
+    spikes = total['spikes']
+    games = len(scores)
+    return {
+        'files': total['files'],
+        'sessions': counts['session_start'],
+        'games': games,
+        'play_minutes': round(total['game_ms'] / 60000.0, 2),
+        'score_mean': round(sum(scores) / games, 2) if games else 0.0,
+        'score_p50': _percentile(scores, 0.50),
+        'score_p95': _percentile(scores, 0.95),
+        'score_max': max(scores, default=0),
+        'ended_by_tree': counts['tree_hit'],
+        'ended_by_gate': counts['gate_missed'],
+        'gates_passed': counts['gate_passed'],
+        'trees_spawned': counts['spawn_tree'],
+        'gates_spawned': counts['spawn_gate'],
+        'speed_ups': counts['speed_up'],
+        'max_speed': round(total['max_speed'], 2),
+        'frame_spikes': len(spikes),
+        'frame_spike_ms_p95': round(_percentile(spikes, 0.95), 2),
+        'quality_changes': counts['quality_change'],
+        'invalid_score_files': counts['invalid_scores'],
+    }
+
+def find_files(paths):
+    """Session files named directly or found in the given directories."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += ski.telemetry_files(path)
+        else:
+            files.append(path)
+    return files
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise Horace Skis Again! telemetry files")
+    parser.add_argument("paths", nargs="*", default=[ski.TELEMETRY_DIR],
+                        help="session files or directories of them (default: %(default)s)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--json", metavar="FILE", help="also write the summary as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = find_files(args.paths)
+    if not files:
+        print("No telemetry files found")
+        return 2
+    if args.jobs > 1 and len(files) > 1:
+        with multiprocessing.Pool(min(args.jobs, len(files))) as pool:
+            parts = pool.map(summarize_file, files, chunksize=max(1, len(files) // (4 * args.jobs)))
+    else:
+        parts = [summarize_file(path) for path in files]
+    for error in (part for part in parts if isinstance(part, str)):
+        print(f"Skipped {error}")
+    summary = report(merge(part for part in parts if not isinstance(part, str)))
+    width = max(len(key) for key in summary)
+    for key, value in summary.items():
+        print(f"{key:<{width}}  {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""Shared helpers for the tests: headless pygame and reproducible games."""
+import os
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import ski
+
+def random_input(seed):
+    """An input source that changes keys at random, reproducibly."""
+    rng = random.Random(seed)
+    keys = [False, False]
+    def read():
+        if rng.random() < 0.1:
+            keys[:] = rng.random() < 0.5, rng.random() < 0.5
+        return tuple(keys)
+    return read
+
+def play(seed, input_seed=0, forest=0, max_ticks=5000):
+    """A finished SkiSimulation game (or one stopped after `max_ticks`)."""
+    sim = ski.SkiSimulation(input_source=random_input(input_seed), seed=seed, forest=forest)
+    sim.run(max_ticks=max_ticks)
+    return sim
+
+def open_display():
+    """A (dummy) display mode, which convert() and prepare() need."""
+    import pygame
+    pygame.display.init()
+    return pygame.display.set_mode((ski.SCREEN_WIDTH, ski.SCREEN_HEIGHT))
@@ -0,0 +1,44 @@
+"""The prepared-layer background cache."""
+import pygame
+import pytest
+
+from helpers import open_display
+import ski
+
+def prepared_layers(seed):
+    layers = [ski.ParallaxLayer(surface, factor) for surface, factor
+              in zip(ski.draw_background_surfaces(seed), ski.BACKGROUND_SPEED_FACTORS)]
+    for layer in layers:
+        layer.prepare()
+    return layers + ski.build_quality_layers(layers, seed)
+
+def pixels(layer):
+    compact = layer.compact
+    return (layer.compact_offset, compact.get_size(), compact.get_colorkey(), compact.get_alpha(),
+            pygame.image.tobytes(compact, "RGBA"))
+
+def test_round_trip():
+    open_display()
+    layers = prepared_layers(5)
+    decoded = ski.decode_prepared_layers(ski.encode_prepared_layers(5, layers), 5)
+    assert [pixels(layer) for layer in decoded] == [pixels(layer) for layer in layers]
+    assert [layer.speed_factor for layer in decoded] == list(ski.BACKGROUND_CACHE_FACTORS)
+
+def test_rejects_corrupt_or_stale_data():
+    open_display()
+    data = ski.encode_prepared_layers(5, prepared_layers(5))
+    damaged = bytearray(data)
+    damaged[len(data) // 2] ^= 0xFF
+    with pytest.raises(ValueError, match="checksum"):
+        ski.decode_prepared_layers(bytes(damaged), 5)
+    with pytest.raises(ValueError):
+        ski.decode_prepared_layers(data[:10], 5)
+    with pytest.raises(ValueError, match="another seed"):
+        ski.decode_prepared_layers(data, 6)
+
+def test_load_writes_then_reads_the_cache(tmp_path):
+    open_display()
+    built = ski.load_prepared_layers(5, str(tmp_path))
+    assert (tmp_path / "background_5.bin").exists()
+    cached = ski.load_prepared_layers(5, str(tmp_path))
+    assert [pixels(layer) for layer in cached] == [pixels(layer) for layer in built]
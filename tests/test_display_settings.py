@@ -0,0 +1,34 @@
+"""SKI_WINDOW and SKI_FPS, parsed when the window opens rather than at import."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ski
+
+def parse(monkeypatch, window="800x600", fps="60"):
+    monkeypatch.setattr(ski, "WINDOW_SETTING", window)
+    monkeypatch.setattr(ski, "FPS_SETTING", fps)
+    monkeypatch.setattr(ski, "WINDOW_SIZE", ski.WINDOW_SIZE)
+    monkeypatch.setattr(ski, "TARGET_FPS", ski.TARGET_FPS)
+    ski.parse_display_settings()
+    return ski.WINDOW_SIZE, ski.TARGET_FPS
+
+def test_parses_window_and_fps(monkeypatch):
+    assert parse(monkeypatch, "1600x1200", "144") == ((1600, 1200), 144)
+    assert parse(monkeypatch, fps="0") == ((800, 600), 0)
+
+@pytest.mark.parametrize("window, fps", [("800", "60"), ("800x", "60"), ("0x600", "60"),
+                                         ("800x600", "sixty"), ("800x600", "-1")])
+def test_malformed_values_exit_with_a_message(monkeypatch, capsys, window, fps):
+    with pytest.raises(SystemExit) as exit_info:
+        parse(monkeypatch, window, fps)
+    assert exit_info.value.code == 2
+    assert "Invalid SKI_" in capsys.readouterr().out
+
+def test_import_survives_malformed_values():
+    env = dict(os.environ, SKI_WINDOW="huge", SKI_FPS="fast", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    result = subprocess.run([sys.executable, "-c", "import ski"], env=env, cwd=os.path.dirname(ski.__file__),
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
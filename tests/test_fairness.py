@@ -0,0 +1,37 @@
+"""The course-fairness analyzer: reachability steps and score bounds."""
+import random
+
+from helpers import play
+import ski_fairness
+
+def spread_naive(positions, steps):
+    for _ in range(steps):
+        left, straight, right = ski_fairness.spread(positions)
+        positions = left | straight | right
+    return positions
+
+def test_spread_many_matches_repeated_spread():
+    rng = random.Random(1)
+    for _ in range(300):
+        positions = 0
+        for _ in range(rng.randint(1, 4)):
+            positions |= 1 << rng.randint(0, ski_fairness.MAX_X)
+        steps = rng.choice((0, 1, 2, 3, rng.randint(4, 60), rng.randint(60, 400)))
+        assert ski_fairness.spread_many(positions, steps) == spread_naive(positions, steps)
+
+def test_spread_saturates_on_screen():
+    steps = ski_fairness.SATURATION_STEPS
+    saturated = spread_naive(1, steps)
+    assert saturated & ~ski_fairness.ALL_POSITIONS == 0
+    assert spread_naive(saturated, 5) == saturated
+    assert ski_fairness.spread_many(1, 10**6) == saturated
+
+def test_no_play_beats_the_analyzer():
+    for seed in range(6):
+        best, tick, cause = ski_fairness.analyze_course(seed, slots=24)
+        assert best % 10 == 0 and cause in ('tree', 'gate', None)
+        for input_seed in range(5):
+            sim = play(seed, input_seed=input_seed, max_ticks=tick)
+            assert sim.score <= best
+            if cause is not None: # Every input is out by `tick`
+                assert sim.game_over
@@ -0,0 +1,16 @@
+"""Placing the 800x600 frame in a window (GPU renderer)."""
+import ski
+
+def test_native_size_fills_the_window():
+    assert tuple(ski.fit_rect((800, 600))) == (0, 0, 800, 600)
+
+def test_aspect_letterboxes_and_centres():
+    assert tuple(ski.fit_rect((1920, 1080))) == (240, 0, 1440, 1080)
+    assert tuple(ski.fit_rect((800, 1000))) == (0, 200, 800, 600)
+
+def test_integer_uses_whole_multiples():
+    assert tuple(ski.fit_rect((1920, 1080), "integer")) == (560, 240, 800, 600)
+    assert tuple(ski.fit_rect((1700, 1300), "integer")) == (50, 50, 1600, 1200)
+
+def test_integer_shrinks_smoothly_below_native_size():
+    assert tuple(ski.fit_rect((400, 300), "integer")) == (0, 0, 400, 300)
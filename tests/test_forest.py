@@ -0,0 +1,46 @@
+"""Forest mode: the course underneath, and the two TreeStore backends."""
+import pygame
+import pytest
+
+from helpers import open_display, play
+import ski
+
+def test_forest_keeps_the_underlying_course():
+    plain = ski.CourseGenerator(7).next_segment()
+    forest = ski.CourseGenerator(7, forest=50).next_segment()
+    assert plain.placements == forest.placements
+    assert any(forest.forest)
+
+def test_tree_store_scrolls_and_culls():
+    store = ski.TreeStore(capacity=2, use_numpy=False) # Also grows past its capacity
+    for y in (0, 300, ski.SCREEN_HEIGHT - 2):
+        store.add(10, y, ski.TREE_TYPES[0])
+    store.scroll(2.5) # Rounded as a Rect would: 2.5 -> 3
+    assert len(store) == 2
+    assert list(store.y[:2]) == [3.0, 303.0]
+
+def test_forest_backends_agree():
+    if ski.numpy is None:
+        pytest.skip("needs NumPy for the vectorized TreeStore")
+    vectorized = play(3, forest=200)
+    saved, ski.numpy = ski.numpy, None
+    try:
+        plain = play(3, forest=200)
+    finally:
+        ski.numpy = saved
+    assert (vectorized.score, vectorized.ticks) == (plain.score, plain.ticks)
+
+def test_tree_store_backends_draw_alike():
+    if ski.numpy is None:
+        pytest.skip("needs NumPy for the vectorized TreeStore")
+    open_display()
+    frames = []
+    for use_numpy in (True, False):
+        store = ski.TreeStore(use_numpy=use_numpy)
+        for i, y in enumerate((-ski.OBSTACLE_HEIGHT - 5, -10.5, 120, 400, ski.SCREEN_HEIGHT - 1)):
+            store.add(40 + 90 * i, y, ski.TREE_TYPES[i % len(ski.TREE_TYPES)])
+        surface = pygame.Surface((ski.SCREEN_WIDTH, ski.SCREEN_HEIGHT))
+        store.draw(surface, dy=-3.5)
+        frames.append(pygame.image.tobytes(surface, "RGB"))
+    assert frames[0] == frames[1]
+    assert frames[0].strip(b"\0") # Something was drawn
@@ -0,0 +1,63 @@
+"""FramePacer's hybrid sleep-then-spin decisions, on a fake clock."""
+import pytest
+
+import ski
+
+class FakeTime:
+    """perf_counter() advances a little per call (like a spin loop); sleep() jumps."""
+    def __init__(self, tick=0.0001):
+        self.now = 100.0
+        self.tick = tick
+        self.sleeps = []
+
+    def perf_counter(self):
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(ski, "time", fake)
+    return fake
+
+def test_sleeps_then_spins_to_the_deadline(clock):
+    pacer = ski.FramePacer(50, 'hybrid') # 20 ms frames
+    pacer.wait() # Sets the first deadline
+    deadline = pacer.deadline
+    clock.now += 0.005 # 5 ms of frame work
+    clock.sleeps.clear()
+    pacer.wait()
+    assert pacer.deadline == pytest.approx(deadline + 0.020)
+    # Slept until HYBRID_SPIN_MS before the deadline, then spun the rest
+    (slept,) = clock.sleeps
+    assert slept == pytest.approx(0.015 - ski.FramePacer.HYBRID_SPIN_MS / 1000.0, abs=0.0005)
+    assert pacer.deadline <= clock.now < pacer.deadline + 0.001
+
+def test_only_spins_close_to_the_deadline(clock):
+    pacer = ski.FramePacer(50, 'hybrid')
+    pacer.wait()
+    clock.now += 0.019 # 1 ms left: less than the spin margin
+    clock.sleeps.clear()
+    pacer.wait()
+    assert clock.sleeps == []
+    assert clock.now >= pacer.deadline
+
+def test_resyncs_when_too_far_behind(clock):
+    pacer = ski.FramePacer(50, 'hybrid')
+    pacer.wait()
+    clock.now += 0.5 # A long stall: don't rush frames to catch up
+    assert pacer.wait() == pytest.approx(20.0, abs=1.0) # A full frame from now
+    assert pacer.deadline <= clock.now < pacer.deadline + 0.001
+
+def test_uncapped_never_waits(clock):
+    pacer = ski.FramePacer(0, 'hybrid')
+    assert pacer.wait() == 0.0
+    assert clock.sleeps == []
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        ski.FramePacer(60, 'nap')
@@ -0,0 +1,55 @@
+"""QualityGovernor's tier decisions, fed synthetic frame work times."""
+import ski
+
+Governor = ski.QualityGovernor
+
+def feed(governor, work_ms, windows=1):
+    """Feeds whole windows of `work_ms` frames; returns the tier changes reported."""
+    changes = [governor.observe(work_ms) for _ in range(windows * Governor.WINDOW_FRAMES)]
+    return [tier for tier in changes if tier is not None]
+
+def test_steps_down_one_tier_per_window_over_budget():
+    governor = Governor(50) # 20 ms budget
+    assert feed(governor, 17.0) == [] # Under DOWN_RATIO of the budget
+    assert feed(governor, 19.0) == [1]
+    assert feed(governor, 19.0, windows=5) == [2, 3]
+    assert governor.tier == len(ski.QUALITY_TIERS) - 1
+
+def test_judges_a_window_by_its_p90():
+    governor = Governor(50)
+    for i in range(Governor.WINDOW_FRAMES):
+        governor.observe(30.0 if i < 2 else 5.0) # Two spikes sit above the p90
+    assert governor.tier == 0
+
+def test_steps_up_after_enough_calm_windows():
+    governor = Governor(50, tier=2)
+    assert feed(governor, 5.0, windows=Governor.UP_WINDOWS - 1) == []
+    assert feed(governor, 5.0) == [1]
+    # A window between the thresholds resets the count
+    feed(governor, 5.0, windows=Governor.UP_WINDOWS - 1)
+    assert feed(governor, 14.0) == []
+    assert feed(governor, 5.0, windows=Governor.UP_WINDOWS - 1) == []
+    assert feed(governor, 5.0) == [0]
+    assert [(old, new) for _, old, new, _ in governor.history] == [(2, 1), (1, 0)]
+
+def test_backs_off_when_a_raise_drops_again():
+    governor = Governor(50, tier=1)
+    assert feed(governor, 5.0, windows=Governor.UP_WINDOWS) == [0]
+    assert feed(governor, 19.0) == [1] # Within FLAP_FRAMES of the raise
+    assert governor.up_windows == 2 * Governor.UP_WINDOWS
+    assert feed(governor, 5.0, windows=Governor.UP_WINDOWS) == []
+    assert feed(governor, 5.0, windows=Governor.UP_WINDOWS) == [0]
+
+def test_a_drop_long_after_a_raise_keeps_the_window_count():
+    governor = Governor(50, tier=1)
+    feed(governor, 5.0, windows=Governor.UP_WINDOWS)
+    feed(governor, 14.0, windows=Governor.FLAP_FRAMES // Governor.WINDOW_FRAMES)
+    assert feed(governor, 19.0) == [1]
+    assert governor.up_windows == Governor.UP_WINDOWS
+
+def test_backoff_is_capped():
+    governor = Governor(50, tier=1)
+    for _ in range(10):
+        feed(governor, 5.0, windows=governor.up_windows)
+        feed(governor, 19.0)
+    assert governor.up_windows == Governor.MAX_UP_WINDOWS
@@ -0,0 +1,41 @@
+"""RowIndex queries against a brute-force scan."""
+import random
+
+import pygame
+
+import ski
+
+class Marker(pygame.sprite.Sprite):
+    def __init__(self, world_y, group):
+        super().__init__(group)
+        self.world_y = world_y
+
+def test_query_matches_brute_force():
+    rng = random.Random(3)
+    group = pygame.sprite.Group()
+    index = ski.RowIndex(row_height=64)
+    sprites = []
+    for _ in range(400):
+        sprite = Marker(rng.randint(-2000, 2000), group)
+        index.insert(sprite, sprite.world_y)
+        sprites.append(sprite)
+    for sprite in rng.sample(sprites, 100):
+        sprite.kill()
+    for sprite in rng.sample(sprites, 50): # Re-filed elsewhere, as pooled sprites are
+        sprite.world_y = rng.randint(-2000, 2000)
+        sprite.add(group)
+        index.insert(sprite, sprite.world_y)
+    for _ in range(200):
+        top = rng.randint(-2100, 2100)
+        bottom = top + rng.randint(0, 300)
+        found = list(index.query(top, bottom))
+        assert len(found) == len(set(found)) # Re-filed sprites appear once
+        expected = {s for s in sprites if s.alive() and top // 64 <= s.world_y // 64 <= bottom // 64}
+        assert set(found) == expected
+
+def test_clear():
+    group = pygame.sprite.Group()
+    index = ski.RowIndex()
+    index.insert(Marker(10, group), 10)
+    index.clear()
+    assert list(index.query(-1000, 1000)) == []
@@ -0,0 +1,41 @@
+"""The binary high-score store and its background writer."""
+import pytest
+
+import ski
+
+def fields(records):
+    return [tuple(getattr(record, name) for name in ski.ScoreRecord.__slots__) for record in records]
+
+def test_score_records_round_trip():
+    records = [ski.ScoreRecord(120, seed=2**64 - 1, duration_ms=65000, max_speed=7.5, gates_passed=12,
+                               timestamp=1700000000),
+               ski.ScoreRecord(10)]
+    assert fields(ski.decode_score_records(ski.encode_score_records(records))) == fields(records)
+
+def test_score_records_reject_bad_crc():
+    data = bytearray(ski.encode_score_records([ski.ScoreRecord(50)]))
+    data[-1] ^= 0x01
+    with pytest.raises(ValueError, match="checksum"):
+        ski.decode_score_records(bytes(data))
+    with pytest.raises(ValueError):
+        ski.decode_score_records(bytes(data[:5]))
+
+def test_store_writes_scores_and_replays_in_background(tmp_path):
+    path = str(tmp_path / "scores.bin")
+    store = ski.ScoreStore(path=path, legacy_path=None)
+    assert store.submit(ski.ScoreRecord(30)) == [30]
+    assert store.submit(ski.ScoreRecord(70)) == [70, 30]
+    replay_path = str(tmp_path / "replays" / "last_run.skr")
+    store.write(replay_path, b"replay")
+    store.close()
+    assert ski.ScoreStore(path=path, legacy_path=None).scores() == [70, 30]
+    with open(replay_path, 'rb') as f:
+        assert f.read() == b"replay"
+
+def test_store_migrates_legacy_text(tmp_path):
+    legacy = tmp_path / "scores.txt"
+    legacy.write_text("40\nnot a score\n90\n")
+    store = ski.ScoreStore(path=str(tmp_path / "scores.bin"), legacy_path=str(legacy))
+    store.close()
+    assert store.scores() == [90, 40]
+    assert ski.ScoreStore(path=str(tmp_path / "scores.bin"), legacy_path=None).scores() == [90, 40]
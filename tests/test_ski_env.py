@@ -0,0 +1,67 @@
+"""Rules parity between the vectorized environment and the real simulation."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import helpers # noqa: F401 (headless pygame)
+import ski
+import ski_env
+
+class CourseVectorSkiEnv(ski_env.VectorSkiEnv):
+    """One vectorized game rolling SkiSimulation's course for `seed` instead of its own.
+
+    The course slots have already passed CourseGenerator's look-ahead check, so the
+    env's own check must leave them untouched.
+    """
+    def __init__(self, seed):
+        self.course_seed = seed
+        super().__init__(1)
+
+    def _reset_games(self, mask):
+        self.feed = ski.CourseFeed(ski.CourseGenerator(self.course_seed))
+        super()._reset_games(mask)
+
+    def _roll(self, count):
+        placement, _ = self.feed.next_slot()
+        if placement is None:
+            slot = (ski_env.PLACE_NONE, 0, 0)
+        elif placement[0] == 'tree':
+            slot = (ski_env.PLACE_TREE, placement[1], ski.TREE_TYPES.index(placement[2]))
+        else:
+            slot = (ski_env.PLACE_GATE, placement[1], placement[2])
+        return tuple(np.array([value]) for value in slot)
+
+def steer(observation, rng):
+    """Heads for the next gate's opening, otherwise presses keys at random."""
+    player_x, gate_left, gate_right = (observation[i] * ski.SCREEN_WIDTH for i in (0, 3, 4))
+    if observation[2] < 1.0:
+        target = (gate_left + gate_right) / 2 - ski.PLAYER_WIDTH / 2
+        return 1 if player_x > target + 5 else 2 if player_x < target - 5 else 0
+    return int(rng.integers(4))
+
+@pytest.mark.parametrize("seed", range(8))
+def test_vector_env_matches_simulation(seed):
+    env = ski_env.SkiEnv(seed=seed)
+    mirror = CourseVectorSkiEnv(seed)
+    rng = np.random.default_rng(seed)
+    observation = env.reset(seed)
+    mirrored = mirror.observe()[0]
+    for _ in range(20000):
+        np.testing.assert_allclose(observation, mirrored)
+        action = steer(observation, rng)
+        observation, reward, done, info = env.step(action)
+        mirrored, rewards, dones, mirror_info = mirror.step(np.array([action]))
+        mirrored = mirrored[0]
+        assert reward == rewards[0]
+        assert done == dones[0]
+        if done:
+            assert mirror_info['final_score'][0] == info['score']
+            return
+    pytest.fail("game never ended")
+
+def test_vector_env_is_seeded():
+    def scores(seed):
+        env = ski_env.VectorSkiEnv(16, seed=seed)
+        actions = np.random.default_rng(0).integers(4, size=(300, 16))
+        return [env.step(step_actions)[3]['score'].tolist() for step_actions in actions]
+    assert scores(5) == scores(5)
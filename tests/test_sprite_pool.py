@@ -0,0 +1,29 @@
+"""SpritePool reuse and its counters."""
+from helpers import play
+import ski
+
+class Entity:
+    def __init__(self, *args):
+        self.args = args
+        self.pool = None
+
+    def reseat(self, *args):
+        self.args = args
+
+def test_pool_allocates_then_reuses():
+    pool = ski.SpritePool(Entity)
+    first = pool.acquire(1, 2)
+    second = pool.acquire(3, 4)
+    assert first.pool is pool and second is not first
+    assert pool.stats() == {'hits': 0, 'allocations': 2, 'free': 0}
+    pool.release(first)
+    reused = pool.acquire(5, 6)
+    assert reused is first and reused.args == (5, 6)
+    assert pool.stats() == {'hits': 1, 'allocations': 2, 'free': 0}
+
+def test_long_game_reuses_sprites():
+    sim = play(11, input_seed=3, max_ticks=3000)
+    stats = sim.pool_stats()
+    # A screenful of trees and gates is allocated; everything after that is recycled
+    assert stats['trees']['allocations'] < 20 and stats['gates']['allocations'] < 20
+    assert stats['trees']['hits'] + stats['gates']['hits'] > 0
@@ -0,0 +1,32 @@
+"""Telemetry session files, in both formats."""
+import pytest
+
+import ski
+
+@pytest.mark.parametrize("file_format", ['binary', 'jsonl'])
+def test_round_trip(tmp_path, file_format):
+    stream = ski.Telemetry(str(tmp_path), file_format)
+    stream.record('game_start', 0, 2**64 - 1, 3) # Any 64-bit seed fits
+    stream.record('game_end', 120, 40, 7.25)
+    stream.close(frames=9)
+    (path,) = ski.telemetry_files(str(tmp_path))
+    events = [event[1:] for event in ski.read_telemetry_file(path)]
+    assert [name for _, name, _, _ in events] == ['session_start', 'game_start', 'game_end', 'session_end']
+    assert events[1] == (0, 'game_start', 2**64 - 1, 3.0)
+    assert events[2] == (120, 'game_end', 40, 7.25)
+    assert events[3][2] == 9
+
+def test_bad_values_are_dropped_not_raised(tmp_path):
+    stream = ski.Telemetry(str(tmp_path))
+    stream.record('game_start', 0, -1) # Doesn't fit the unsigned field
+    stream.record('frame_spike', 0, 1, "slow")
+    stream.close()
+    assert stream.dropped == 2
+
+def test_unknown_event_raises(tmp_path):
+    stream = ski.Telemetry(str(tmp_path))
+    try:
+        with pytest.raises(KeyError):
+            stream.record('gate_pased')
+    finally:
+        stream.close()
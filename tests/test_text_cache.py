@@ -0,0 +1,32 @@
+"""TextCache's least-recently-used eviction."""
+import ski
+
+class CountingFont:
+    """Stands in for a pygame Font: render() returns a fresh token and is counted."""
+    def __init__(self):
+        self.renders = 0
+
+    def render(self, text, antialias, color):
+        self.renders += 1
+        return (text, color, self.renders)
+
+def test_hits_do_not_render_again():
+    font = CountingFont()
+    cache = ski.TextCache(max_entries=4)
+    image = cache.render(font, "Score: 10", ski.BLACK)
+    assert cache.render(font, "Score: 10", ski.BLACK) is image
+    assert cache.render(font, "Score: 10", ski.WHITE) is not image # Colour is part of the key
+    assert font.renders == 2
+
+def test_evicts_least_recently_used():
+    font = CountingFont()
+    cache = ski.TextCache(max_entries=2)
+    a = cache.render(font, "a", ski.BLACK)
+    cache.render(font, "b", ski.BLACK)
+    cache.render(font, "a", ski.BLACK) # "b" is now the least recently used
+    cache.render(font, "c", ski.BLACK)
+    assert len(cache.entries) == 2
+    assert cache.render(font, "a", ski.BLACK) is a
+    renders = font.renders
+    cache.render(font, "b", ski.BLACK)
+    assert font.renders == renders + 1 # Was evicted, so rendered again